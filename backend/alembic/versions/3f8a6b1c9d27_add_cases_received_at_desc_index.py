@@ -0,0 +1,34 @@
+"""add cases received_at desc index
+
+Revision ID: 3f8a6b1c9d27
+Revises: 9c1d4e7a2b60
+Create Date: 2026-10-15 09:31:05.771942
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '3f8a6b1c9d27'
+down_revision: Union[str, Sequence[str], None] = '9c1d4e7a2b60'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_index(
+        'ix_cases_received_at_desc',
+        'cases',
+        [sa.text('received_at DESC')],
+        unique=False,
+        postgresql_include=['id', 'initial_awareness_at', 'status'],
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_cases_received_at_desc', table_name='cases')
@@ -0,0 +1,28 @@
+"""add case_event_log (case_id, occurred_at) index
+
+Revision ID: 9c1d4e7a2b60
+Revises: 40389f230b26
+Create Date: 2026-10-15 09:12:40.318204
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '9c1d4e7a2b60'
+down_revision: Union[str, Sequence[str], None] = '40389f230b26'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_index('ix_case_event_log_case_occurred', 'case_event_log', ['case_id', 'occurred_at'], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_case_event_log_case_occurred', table_name='case_event_log')
@@ -0,0 +1,29 @@
+"""drop redundant case_event_log case_id index
+
+Revision ID: b7e2f4a18c53
+Revises: 3f8a6b1c9d27
+Create Date: 2026-10-15 11:04:22.318406
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'b7e2f4a18c53'
+down_revision: Union[str, Sequence[str], None] = '3f8a6b1c9d27'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # ix_case_event_log_case_occurred (case_id, occurred_at) serves every case_id lookup via its leading column
+    op.drop_index(op.f('ix_case_event_log_case_id'), table_name='case_event_log')
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.create_index(op.f('ix_case_event_log_case_id'), 'case_event_log', ['case_id'], unique=False)
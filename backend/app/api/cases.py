@@ -1,7 +1,7 @@
 from fastapi import Depends
 from datetime import datetime
 
-from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
 
 from app.db.session import get_db
 from app.db.models import Case, CaseEventLog, ActorType, EventType
@@ -1,38 +1,136 @@
-from fastapi import APIRouter, Depends
-from sqlalchemy.orm import Session
+import time
+from typing import Optional, Tuple
 
-from app.db.session import get_db
-from app.db.models import Case, CaseEventLog
+import orjson
+from fastapi import APIRouter, Depends, Request, Response
+from sqlalchemy import String, Text, case, cast, extract, func, literal_column, select
+from sqlalchemy.dialects.postgresql import aggregate_order_by
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.db.session import get_read_db
+from app.db.models import ActorType, Case, CaseEventLog, CaseStatus, EventType
+from app.db.schemas import LatestCaseOut
+from app.services.case_events import events_version
 
 router = APIRouter(prefix="/debug", tags=["debug"])
 
-@router.get("/latest")
-def latest(db:Session = Depends(get_db)):
-    case = db.query(Case).order_by(Case.received_at.desc()).first()
-    if not case:
-        return {"case": None, "events": []}
-    
-    events = (
-        db.query(CaseEventLog).filter(CaseEventLog.case_id == case.id).order_by(CaseEventLog.occurred_at.asc()).all()
+# Pollers hit this endpoint far more often than events are written, so keep the
+# serialized body around briefly. Any event write in this process invalidates it immediately.
+_CACHE_TTL_SECONDS = 1.0
+_latest_cache: Optional[Tuple[int, float, str, bytes]] = None # (events_version, expires_at, etag, body)
+
+def _enum_value(column, enum_cls):
+    # Enum columns are stored by member name; the API exposes member values
+    return case({m.name: m.value for m in enum_cls}, value=cast(column, String))
+
+def _iso_utc(column):
+    # timestamptz -> the same text the Python path produced (datetime.isoformat() of an aware UTC value):
+    # always UTC regardless of the session TimeZone, 6 fractional digits, no fraction on a whole second
+    utc = func.timezone("UTC", column)
+    return case(
+        (extract("microseconds", utc) % 1_000_000 == 0, func.to_char(utc, 'YYYY-MM-DD"T"HH24:MI:SS"+00:00"')),
+        else_=func.to_char(utc, 'YYYY-MM-DD"T"HH24:MI:SS.US"+00:00"'),
     )
 
-    return {
-        "case": {
-            "id": str(case.id),
-            "received_at": case.received_at,
-            "initial_awareness_at": case.initial_awareness_at,
-            "status": case.status.value if hasattr(case.status, "value") else str(case.status),
-        },
-        "events": [
-            {
-                "id": str(e.id),
-                "event_type": e.event_type.value if hasattr(e.event_type, "value") else str(e.event_type),
-                "occurred_at": e.occurred_at,
-                "actor_type": e.actor_type.value if hasattr(e.actor_type, "value") else str(e.actor_type),
-                "actor_id": e.actor_id,
-                "reason": e.reason,
-                "payload": e.payload,
-            }
-            for e in events
-        ],
-    }
\ No newline at end of file
+# ---- statements (built once; the shape never changes) ----
+
+_latest_case = (
+    select(Case.id, Case.received_at, Case.initial_awareness_at, Case.status)
+    .order_by(Case.received_at.desc())
+    .limit(1)
+    .cte("latest_case")
+)
+
+# events are append-only, so (case, how many events, newest event time) identifies the payload
+_etag_columns = (_latest_case.c.id, func.count(CaseEventLog.id), func.max(CaseEventLog.occurred_at))
+
+# Postgres builds the whole response document; we get back one row with one text column
+_latest_document = func.json_build_object(
+    "case", func.json_build_object(
+        "id", _latest_case.c.id,
+        "received_at", _iso_utc(_latest_case.c.received_at),
+        "initial_awareness_at", _iso_utc(_latest_case.c.initial_awareness_at),
+        "status", _enum_value(_latest_case.c.status, CaseStatus),
+    ),
+    "events", func.coalesce(
+        func.json_agg(
+            aggregate_order_by(
+                func.json_build_object(
+                    "id", CaseEventLog.id,
+                    "event_type", _enum_value(CaseEventLog.event_type, EventType),
+                    "occurred_at", _iso_utc(CaseEventLog.occurred_at),
+                    "actor_type", _enum_value(CaseEventLog.actor_type, ActorType),
+                    "actor_id", CaseEventLog.actor_id,
+                    "reason", CaseEventLog.reason,
+                    "payload", CaseEventLog.payload,
+                ),
+                CaseEventLog.occurred_at.asc(),
+            )
+        ).filter(CaseEventLog.id.is_not(None)), # outer join: a case with no events yields one all-NULL row
+        literal_column("'[]'::json"),
+    ),
+)
+
+_LATEST_ETAG = (
+    select(*_etag_columns)
+    .select_from(_latest_case)
+    .outerjoin(CaseEventLog, CaseEventLog.case_id == _latest_case.c.id)
+    .group_by(_latest_case.c.id)
+)
+
+_LATEST_BODY = (
+    select(cast(_latest_document, Text), *_etag_columns)
+    .select_from(_latest_case)
+    .outerjoin(CaseEventLog, CaseEventLog.case_id == _latest_case.c.id)
+    .group_by(*_latest_case.c)
+)
+
+_EMPTY_BODY = orjson.dumps({"case": None, "events": []})
+
+# ---- helpers ----
+
+def _make_etag(case_id, event_count: int, last_event_at) -> str:
+    if case_id is None:
+        return 'W/"none"'
+    return f'W/"{case_id}-{event_count}-{last_event_at.isoformat() if last_event_at else ""}"'
+
+async def _latest_etag(db: AsyncSession) -> str:
+    # cheap probe for conditional requests: one aggregate row instead of the whole timeline
+    row = (await db.execute(_LATEST_ETAG)).first()
+    if row is None:
+        return _make_etag(None, 0, None)
+    return _make_etag(*row)
+
+async def _build_latest(db: AsyncSession) -> Tuple[str, bytes]:
+    # one round trip, one row: the document is already JSON text, so Python only encodes it to bytes
+    row = (await db.execute(_LATEST_BODY)).first()
+    if row is None:
+        return _make_etag(None, 0, None), _EMPTY_BODY
+
+    document, case_id, event_count, last_event_at = row
+    return _make_etag(case_id, event_count, last_event_at), document.encode()
+
+# response_model=None: the body is already serialized, so FastAPI must not validate or re-encode it
+@router.get("/latest", response_model=None, responses={200: {"model": LatestCaseOut}})
+async def latest(request: Request, db: AsyncSession = Depends(get_read_db)):
+    global _latest_cache
+
+    if_none_match = request.headers.get("if-none-match")
+    version = events_version()
+    now = time.monotonic()
+    cached = _latest_cache
+    if cached is None or cached[0] != version or cached[1] <= now:
+        if if_none_match is not None:
+            # the client may already hold the current payload; check before building it
+            etag = await _latest_etag(db)
+            if etag == if_none_match:
+                return Response(status_code=304, headers={"ETag": etag})
+
+        etag, body = await _build_latest(db)
+        cached = (version, now + _CACHE_TTL_SECONDS, etag, body)
+        _latest_cache = cached
+
+    _, _, etag, body = cached
+    if if_none_match == etag:
+        return Response(status_code=304, headers={"ETag": etag})
+    return Response(body, media_type="application/json", headers={"ETag": etag})
\ No newline at end of file
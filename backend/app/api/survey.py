@@ -1,725 +1,379 @@
 # HTTP Routes (requests/response shapes, calls engine)
-from fastapi import APIRouter, HTTPException
-from pydantic import BaseModel
-from typing import Optional, List
-from datetime import datetime, timezone
-from app.core import config
+from fastapi import APIRouter, HTTPException, Request
+from fastapi.responses import ORJSONResponse
+from typing_extensions import TypedDict
+from typing import Callable, NoReturn, Optional, List, Tuple
+from dataclasses import dataclass
+from app.core.config import SURVEY_VERSION
+from app.core.clock import utc_now_iso
 import re
+import sys
+import orjson
+from types import MappingProxyType
+from functools import lru_cache
+from pathlib import Path
+from pydantic import TypeAdapter
 
-router = APIRouter() # Routers = modular endpoints (keeps code organized by endpoints)
+router = APIRouter(default_response_class=ORJSONResponse) # Routers = modular endpoints (keeps code organized by endpoints)
 
 @router.get("/survey/test")
 def survey_test():
     return {"status": "survey alive"}
 
-class SurveyRequest(BaseModel):
+# Request bodies are TypedDicts. Both handlers parse the raw bytes themselves (no model instance per request,
+# or per history step on /survey/evaluate), so SurveyRequest and EvaluateRequest are wired into the OpenAPI
+# schema through _request_body() rather than as handler parameters.
+class SurveyRequest(TypedDict, total=False):
+    section: Optional[str]      # section question_id belongs to; omitted -> min_criteria_questions (echo the response's "section")
     question_id: Optional[str]
     answer: Optional[str]
 
-
-SURVEY_DEFINITION = {
-    "min_criteria_questions": {
-
-    "q1": {
-        "id": "q1",
-        "text": "Who is reporting this information?",
-        "type": "single_choice",
-        "options": {
-            "a": {"label": "I am a healthcare professional (HCP)", "next": "q2"},
-            "b": {"label": "I am not a healthcare professional (consumer)", "next": "q2"},
-            "c": {"label": "This is from a published article (literature)", "next": "q2"},
-            "d": {"label": "This is from a partner organization", "next": "q2"},
-            "e": {"label": "This is from a study", "next": "q2"}
-        },
-        "constraints": {"required": True}
-    },
-
-    "q2": {
-        "id": "q2",
-        "text": "Can we contact you for follow-up if needed?",
-        "type": "single_choice",
-        "options": {
-            "a": {"label": "Yes", "next": "q2a"},
-            "b": {"label": "No", "next": "q3"}
-        },
-        "constraints": {"required": True}
-    },
-
-    "q2a": {
-        "id": "q2a",
-        "text": "What is the best way to contact you?",
-        "type": "single_choice",
-        "options": {
-            "a": {"label": "Email", "next": "q2a_email"},
-            "b": {"label": "Phone", "next": "q2a_phone"},
-            "c": {"label": "Other", "next": "q2a_other"}
-        },
-        "constraints": {"required": True}
-    },
-
-    "q2a_email": {
-        "id": "q2a_email",
-        "text": "Enter your email address",
-        "type": "free_text",
-        "next": "q3",
-        "hints": {"placeholder": "name@example.com"},
-        "constraints": {"required": True}
-    },
-
-    "q2a_phone": {
-        "id": "q2a_phone",
-        "text": "Enter your phone number",
-        "type": "free_text",
-        "next": "q3",
-        "hints": {"placeholder": "e.g., +1 555 555 5555"},
-        "constraints": {"required": True}
-    },
-
-    "q2a_other": {
-        "id": "q2a_other",
-        "text": "Enter the best way to contact you",
-        "type": "free_text",
-        "next": "q3",
-        "hints": {"placeholder": "e.g., secure portal message"},
-        "constraints": {"required": True}
-    },
-
-    "q3": {
-        "id": "q3",
-        "text": "Are you the person who experienced the event?",
-        "type": "single_choice",
-        "options": {
-            "a": {"label": "Yes (I am the patient)", "next": "q4"},
-            "b": {"label": "No (I am reporting for someone else)", "next": "q3a"}
-        },
-        "constraints": {"required": True}
-    },
-
-    "q3a": {
-        "id": "q3a",
-        "text": "What is your relationship to the patient?",
-        "type": "single_choice",
-        "options": {
-            "a": {"label": "Parent/Guardian", "next": "q4"},
-            "b": {"label": "Spouse/Partner", "next": "q4"},
-            "c": {"label": "Family member", "next": "q4"},
-            "d": {"label": "Caregiver", "next": "q4"},
-            "e": {"label": "Friend/Other", "next": "q3a_other"}
-        },
-        "constraints": {"required": True}
-    },
-
-    "q3a_other": {
-        "id": "q3a_other",
-        "text": "Describe your relationship to the patient",
-        "type": "free_text",
-        "next": "q4",
-        "hints": {"placeholder": "e.g., roommate, coach, etc."},
-        "constraints": {"required": True}
-    },
-
-    "q4": {
-        "id": "q4",
-        "text": "Please provide at least one detail about the person who experienced the event.",
-        "type": "single_choice",
-        "options": {
-            "a": {"label": "Age", "next": "q4a"},
-            "b": {"label": "Sex", "next": "q4b"},
-            "c": {"label": "Initials (optional identifier)", "next": "q4c"},
-            "d": {"label": "I don't know any of these", "next": "q4_missing"}
-        },
-        "constraints": {"required": True}
-    },
-
-    "q4a": {
-        "id": "q4a",
-        "text": "Enter the patient's age (number only)",
-        "type": "free_text",
-        "next": "q4a_unit",
-        "hints": {"placeholder": "e.g., 34"},
-        "constraints": {"required": True}
-    },
-
-    "q4a_unit": {
-        "id": "q4a_unit",
-        "text": "Select the age unit",
-        "type": "single_choice",
-        "options": {
-            "a": {"label": "Years", "next": "q5"},
-            "b": {"label": "Months", "next": "q5"},
-            "c": {"label": "Days", "next": "q5"},
-            "d": {"label": "Unknown", "next": "q5"}
-        },
-        "constraints": {"required": True}
-    },
-
-    "q4b": {
-        "id": "q4b",
-        "text": "Select the patient's sex",
-        "type": "single_choice",
-        "options": {
-            "a": {"label": "Male", "next": "q5"},
-            "b": {"label": "Female", "next": "q5"},
-            "c": {"label": "Other", "next": "q5"},
-            "d": {"label": "Unknown", "next": "q5"}
-        },
-        "constraints": {"required": True}
-    },
-
-    "q4c": {
-        "id": "q4c",
-        "text": "Enter the patient's initials",
-        "type": "free_text",
-        "next": "q5",
-        "hints": {"placeholder": "e.g., J.D."},
-        "constraints": {"required": True}
-    },
-
-    "q4_missing": {
-        "id": "q4_missing",
-        "text": "Understood. Without at least one patient detail (age, sex, or initials), the report may be incomplete. Would you like to proceed anyway?",
-        "type": "single_choice",
-        "options": {
-            "a": {"label": "Yes, proceed", "next": "q5"},
-            "b": {"label": "No, go back", "next": "q4"}
-        },
-        "constraints": {"required": True}
-    },
-
-    "q5": {
-        "id": "q5",
-        "text": "What product do you believe is related to the event?",
-        "type": "free_text",
-        "next": "q6",
-        "hints": {"placeholder": "e.g., medication/vaccine name"},
-        "constraints": {"required": True}
-    },
-
-    "q6": {
-        "id": "q6",
-        "text": "What happened?",
-        "type": "free_text",
-        "next": "GOTO:ae_selector:q1",
-        "hints": {"placeholder": "Describe the symptoms or event in your own words"},
-        "constraints": {"required": True}
-    },
-
-},
-
-    "ae_selector": {
-        "q1": {
-            "id": "q1",
-            "text": "Which symptom category best matches?",
-            "type": "single_choice",
-            "options": {
-            "a": {"label": "Abdominal / GI", "next": "GOTO:abdominal_questions:q1"},
-            "b": {"label": "Headache / Neuro", "next": "GOTO:headache_questions:q1"},
-            "c": {"label": "Vomiting", "next": "GOTO:vomiting_questions:q1"},
-            }
-        }
-    },
-
-    "abdominal_questions": {
-
-        "q1": {
-            "id": "q1",
-            "text": "When did this symptom start?",
-            "type": "single_choice",
-            "options": {
-                "a": {"label": "Exact date, if known", "next": "q1a"},   # -> new free_text node
-                "b": {"label": "Approximate date",      "next": "q1b"}    # -> new free_text node
-            }
-        },
-
-        # --- new node: exact date ---
-        "q1a": {
-            "id": "q1a",
-            "text": "Enter the exact date (YYYY-MM-DD)",
-            "type": "free_text",
-            "next": "q2",
-            "hints": {"placeholder": "YYYY-MM-DD"},
-            "constraints": {"required": True}
-        },
-
-        # --- new node: approximate date ---
-        "q1b": {
-            "id": "q1b",
-            "text": "Enter an approximate date (e.g., 'about 2 weeks ago')",
-            "type": "free_text",
-            "next": "q2",
-            "hints": {"placeholder": "e.g., about 2 weeks ago"},
-            "constraints": {"required": True}
-        },
-
-        "q2": {
-            "id": "q2",
-            "text": "Do you still have pain?",
-            "type": "single_choice",
-            "options": {
-                "a": {"label": "Yes. Go to #4.", "next": "q4"},
-                "b": {"label": "No.", "next": "q3"}
-            }
-        },
-
-        "q3": {
-            "id": "q3",
-            "text": "When did the symptom stop?",
-            "type": "single_choice",
-            "options": {
-                "a": {"label": "Exact date, if known", "next": "q4"},
-                "b": {"label": "Approximate date", "next": "q3b"}
-            }
-        },
-
-        "q3a": {
-            "id": "q3a",
-            "text": "Enter the exact date (YYYY-MM-DD)",
-            "type": "free_text",
-            "next": "q4",
-            "hints": {"placeholder": "YYYY-MM-DD"},
-            "constraints": {"required": True}
-        },
-
-          "q3b": {
-            "id": "q3b",
-            "text": "Enter an approximate date the symptoms stopped (e.g., 'about 2 weeks ago')",
-            "type": "free_text",
-            "next": "q4",
-            "hints": {"placeholder": "e.g., about 2 weeks ago"},
-            "constraints": {"required": True}
-        },
-
-        "q4": {
-            "id": "q4",
-            "text": "Is (was) the pain:",
-            "type": "single_choice",
-            "options": {
-                "a": {"label": "Sharp?", "next": "q5"},
-                "b": {"label": "Dull?", "next": "q5"},
-                "c": {"label": "Throbbing?", "next": "q5"},
-                "d": {"label": "Burning?", "next": "q5"},
-                "e": {"label": "Cramping?", "next": "q5"}
-            }
-        },
-
-        "q5": {
-            "id": "q5",
-            "text": "How would you grade the intensity of the pain? (Refer to visual analog pain scale)",
-            "type": "scale",
-            "options": {  # For now we will leave next as None but, later we will wire to q6.
-                "a": {"label": "2 - Hurts Little Bit", "next": "q6"},
-                "b": {"label": "4 - Hurts Little More", "next": "q6"},
-                "c": {"label": "6 - Hurts Even More", "next": "q6"},
-                "d": {"label": "8 - Hurts Whole Lot", "next": "q6"},
-                "e": {"label": "10 - Hurts Worst", "next": "q6"}
-            }
-        },
-        # --- Q6: sleep disruption ---
-        "q6": {
-            "id": "q6",
-            "text": "Does (did) the symptom disrupt your sleep?",
-            "type": "single_choice",
-            "options": {
-                "a": {"label": "Yes.", "next": "q7"},
-                "b": {"label": "No.",  "next": "q7"},
-                "c": {"label": "N/A. I did not have pain during sleep.", "next": "q7"}
-            }
-        },
-
-        # --- Q7: localized vs generalized ---
-        "q7": {
-            "id": "q7",
-            "text": "Is (was) the abdominal pain localized or generalized?",
-            "type": "single_choice",
-            "options": {
-                "a": {"label": "Localized. (Confined to one specific area of the body)",   "next": "q8"},
-                "b": {"label": "Generalized. (Affect the entire body or a large region of it)", "next": "q9"}
-            }
-        },
-
-        # --- Q8: main location (refer to figure 1) ---
-        "q8": {
-            "id": "q8",
-            "text": "Where in the abdomen is (was) the pain mainly located? (Refer to figure 1.)",
-            "type": "single_choice",
-            "options": {
-                "a": {"label": "Upper right side (RUQ)",          "next": "q9"},
-                "b": {"label": "Lower right side (RLQ)",          "next": "q9"},
-                "c": {"label": "Upper left side (LUQ)",           "next": "q9"},
-                "d": {"label": "Lower left side (LLQ)",           "next": "q9"},
-                "e": {"label": "Upper central (epigastric)",      "next": "q9"},
-                "f": {"label": "Middle central (periumbilical)",  "next": "q9"},
-                "g": {"label": "Lower central (suprapubic)",      "next": "q9"}
-            }
-        },
-
-        # --- Q9: radiate? ---
-        "q9": {
-            "id": "q9",
-            "text": "Does (did) the pain radiate?",
-            "type": "single_choice",
-            "options": {
-                "a": {"label": "Yes.", "next": "q10"},
-                "b": {"label": "No. Go to #11.", "next": "q11"}
-            }
-        },
-
-        # --- Q10: where does it radiate (free text) ---
-        "q10": {
-            "id": "q10",
-            "text": "Where does (did) the pain radiate? (Refer to figure 1.)",
-            "type": "free_text",
-            "next": "q11",
-            "hints": {"placeholder": "e.g., back, shoulder, groin"},
-            "constraints": {"required": True}
-        },
-
-        # --- Q11: current course of symptom ---
-        "q11": {
-            "id": "q11",
-            "text": "If you are still having this symptom, is it:",
-            "type": "single_choice",
-            "options": {
-                "a": {"label": "Worsening?",            "next": "q12"},
-                "b": {"label": "Stable?",               "next": "q12"},
-                "c": {"label": "Improving?",            "next": "q12"},
-                "d": {"label": "Unsure.",               "next": "q12"},
-                "e": {"label": "No longer having pain.", "next": "q12"}
-            }
-        },
-
-        # --- Q12: impact on routine ---
-        "q12": {
-            "id": "q12",
-            "text": "The symptom",
-            "type": "single_choice",
-            "options": {
-                "a": {"label": "Has not affected my daily routine at all.",            "next": "q13"},
-                "b": {"label": "Has caused me to cancel some of my daily routine.",    "next": "q13"},
-                "c": {"label": "Has caused me to cancel all of my daily routine.",     "next": "q13"}
-            }
-        },
-
-        # --- Q13: abdominal tenderness ---
-        "q13": {
-            "id": "q13",
-            "text": "Is (was) there any abdominal tenderness (area tender to touch)?",
-            "type": "single_choice",
-            "options": {
-                "a": {"label": "Yes", "next": "q14"},
-                "b": {"label": "No",  "next": "q14"}
-            }
-        },
-
-        # --- Q14: recent trauma ---
-        "q14": {
-            "id": "q14",
-            "text": "Have you had any recent trauma before the symptom began?",
-            "type": "single_choice",
-            "options": {
-                "a": {"label": "Yes.", "next": "q15"},
-                "b": {"label": "No.",  "next": "q15"}
-            }
-        },
-
-        # --- Q15: positional pain ---
-        "q15": {
-            "id": "q15",
-            "text": "Is (was) the abdominal pain positional (better/worse in a position)?",
-            "type": "single_choice",
-            "options": {
-                "a": {"label": "Yes.", "next": "q16"},
-                "b": {"label": "No.",  "next": "q16"}
-            }
-        },
-
-        # --- Q16: anything lessens/improves? -> optional detail ---
-        "q16": {
-            "id": "q16",
-            "text": "Does (did) anything appear to lessen or improve the symptom?",
-            "type": "single_choice",
-            "options": {
-                "a": {"label": "Yes. What?", "next": "q16a"},
-                "b": {"label": "No.",        "next": "q17"}
-            }
-        },
-        "q16a": {
-            "id": "q16a",
-            "text": "What improves the symptom?",
-            "type": "free_text",
-            "next": "q17",
-            "hints": {"placeholder": "e.g., rest, heat, medication name"},
-            "constraints": {"required": True}
-        },
-
-        # --- Q17: anything worsens? -> optional detail ---
-        "q17": {
-            "id": "q17",
-            "text": "Does (did) anything appear to worsen the symptom?",
-            "type": "single_choice",
-            "options": {
-                "a": {"label": "Yes. What?", "next": "q17a"},
-                "b": {"label": "No.",        "next": "q18"}
-            }
-        },
-        "q17a": {
-            "id": "q17a",
-            "text": "What worsens the symptom?",
-            "type": "free_text",
-            "next": "q18",
-            "hints": {"placeholder": "e.g., certain foods, movement"},
-            "constraints": {"required": True}
-        },
-
-        # --- Q18: deep breath worsens? ---
-        "q18": {
-            "id": "q18",
-            "text": "Does (did) taking a deep breath worsen the abdominal pain?",
-            "type": "single_choice",
-            "options": {
-                "a": {"label": "Yes.", "next": "q19"},
-                "b": {"label": "No.",  "next": "q19"}
-            }
-        },
-
-        # --- Q19: unusual stress -> optional detail ---
-        "q19": {
-            "id": "q19",
-            "text": "Are you under any unusual stress?",
-            "type": "single_choice",
-            "options": {
-                "a": {"label": "Yes. What?", "next": "q19a"},
-                "b": {"label": "No.",        "next": "q20"}
-            }
-        },
-        "q19a": {
-            "id": "q19a",
-            "text": "Describe the stress:",
-            "type": "free_text",
-            "next": "q20",
-            "hints": {"placeholder": "brief description"},
-            "constraints": {"required": True}
-        },
-
-        # --- Q20: apparent cause -> optional detail ---
-        "q20": {
-            "id": "q20",
-            "text": "Did anything appear to cause this symptom?",
-            "type": "single_choice",
-            "options": {
-                "a": {"label": "Yes. What?", "next": "q20a"},
-                "b": {"label": "No.",        "next": None}
-            }
-        },
-        "q20a": {
-            "id": "q20a",
-            "text": "What do you think caused the symptom?",
-            "type": "free_text",
-            "next": "q21",
-            "hints": {"placeholder": "brief description"},
-            "constraints": {"required": True}
-        },
-
-    },
-    
-    "headache_questions":{
-
-
-
-
-
-
-
-
-
-
-    }
+def _request_body(body_type, required: bool) -> dict: # openapi_extra documenting a body the handler reads itself
+    schema = TypeAdapter(body_type).json_schema()
+    defs = schema.pop("$defs", {})
+
+    def inline(node): # the schema is embedded in the operation, so nested TypedDict $refs are resolved in place
+        if isinstance(node, dict):
+            ref = node.get("$ref")
+            if ref is not None:
+                return inline(defs[ref.rsplit("/", 1)[1]])
+            return {k: inline(v) for k, v in node.items()}
+        if isinstance(node, list):
+            return [inline(v) for v in node]
+        return node
+
+    return {"requestBody": {"required": required, "content": {"application/json": {"schema": inline(schema)}}}}
+
+
+_SURVEY_DATA_PATH = Path(__file__).with_name("survey_data.json")
+
+def _intern_keys(value): # JSON keys are not interned like source literals; request ids are interned to match them
+    if isinstance(value, dict):
+        return {sys.intern(k): _intern_keys(v) for k, v in value.items()}
+    return value
+
+@lru_cache(maxsize=None)
+def load_survey_definition() -> MappingProxyType: # the question graph, parsed from survey_data.json once per process
+    with open(_SURVEY_DATA_PATH, "rb") as f:
+        definition = _intern_keys(orjson.loads(f.read()))
+    # Nothing mutates the definition at runtime, and the pre-rendered payloads below share its
+    # hints/constraints dicts, so freeze the section maps behind read-only views.
+    return MappingProxyType({
+        section: MappingProxyType(questions) for section, questions in definition.items()
+    })
+
+SURVEY_DEFINITION = load_survey_definition()
+
+
+def _is_iso_date(value: str) -> bool: # YYYY-MM-DD shape check, same as re.fullmatch(r"\d{4}-\d{2}-\d{2}") without the regex engine
+    return (
+        len(value) == 10
+        and value[4] == "-"
+        and value[7] == "-"
+        and value[:4].isdecimal()
+        and value[5:7].isdecimal()
+        and value[8:].isdecimal()
+    )
+
+# The timestamp only has millisecond precision, so every request landing in the same millisecond
+# gets an identical block; reuse the dict instead of rebuilding it.
+_META_CACHE: dict = {"version": SURVEY_VERSION, "timestamp": ""}
+
+def cached_meta() -> dict: # server-authored meta (version + ISO-8601 UTC timestamp), shared per millisecond: callers must not mutate it
+    global _META_CACHE
+    ts = utc_now_iso()
+    meta = _META_CACHE
+    if meta["timestamp"] != ts:
+        meta = {"version": SURVEY_VERSION, "timestamp": ts}
+        _META_CACHE = meta # one reference swap: concurrent readers see the old block or the new one
+    return meta
+
+# Error table: name -> (status, code, message template). Only the message and meta vary per request.
+_ERR = {
+    "UNKNOWN_QUESTION":      (400, "UNKNOWN_QUESTION",  "Invalid question ID: {qid}"),
+    "UNKNOWN_SECTION":       (400, "UNKNOWN_SECTION",   "Invalid section: {section}"),
+    "EMPTY_SECTION":         (400, "EMPTY_SECTION",     "Section {section} has no start question '{qid}'"),
+    "MISSING_ANSWER":        (400, "MISSING_ANSWER",    "Missing answer for {qid}: {text}"),
+    "DATE_FORMAT":           (400, "DATE_FORMAT",       "Use YYYY-MM-DD (e.g., 2025-09-01)"),
+    "INVALID_ANSWER":        (400, "INVALID_ANSWER",    "Answer not allowed for {qid}"),
+    "INVALID_ANSWER_KEY":    (400, "INVALID_ANSWER",    "Answer key '{key}' not allowed for {qid}"),
+    "UNSUPPORTED_TYPE":      (400, "UNSUPPORTED_TYPE",  "Unsupported type {qtype}"),
+    "UNSUPPORTED_TYPE_ON":   (400, "UNSUPPORTED_TYPE",  "Unsupported type {qtype} on {qid}"),
+    "FLOW_DIVERGENCE":       (400, "FLOW_DIVERGENCE",   "Expected '{cursor}', got '{qid}'"),
+    "INVALID_BODY":          (422, "INVALID_BODY",      "Body must be a JSON object with optional string fields section, question_id and answer"),
+    "INVALID_HISTORY":       (422, "INVALID_BODY",      "Body must be a JSON object with a history list of question_id/answer string pairs"),
+    "BROKEN_FREE_TEXT_NEXT": (500, "BROKEN_DEFINITION", "free_text '{qid}' points to unknown question '{next_qid}' in section '{next_section}'"),
+    "BROKEN_OPTION_NEXT":    (500, "BROKEN_DEFINITION", "Option '{key}' on '{qid}' points to unknown question '{next_qid}' in section '{next_section}'"),
+    "BROKEN_NEXT":           (500, "BROKEN_DEFINITION", "'{qid}' points to unknown next '{next_qid}' in section '{next_section}'"),
+    "BROKEN_CURSOR":         (500, "BROKEN_DEFINITION", "Missing node for expected cursor '{cursor}'"),
 }
 
-
-def build_meta() -> dict: # Returning server_authored metadata with an ISO-8601 UTC timestamp
-
-    now_utc = datetime.now(timezone.utc) # timezone aware UTC
-    ts = now_utc.isoformat(timespec="milliseconds").replace("+00:00", "Z")
-
-    return {
-        "version": config.SURVEY_VERSION,
-        "timestamp": ts
-    }
-
-def show_question(question) -> dict:
-    payload = {
-        "next": {
-            "id": question["id"],
-            "text": question["text"],
-            "type": question["type"],
-        },
-        "done": False,
-        "meta": build_meta(),
+def _raise(name: str, meta: dict, **fmt) -> NoReturn: # raise the HTTPException for an _ERR entry
+    status, code, tmpl = _ERR[name]
+    raise HTTPException(
+        status_code=status,
+        detail={"error": {"code": code, "message": tmpl.format(**fmt) if fmt else tmpl}, "meta": meta},
+    )
+
+def _render_question(question) -> dict: # the frontend-facing "next" block for a node (no request-specific data)
+    rendered = {
+        "id": question["id"],
+        "text": question["text"],
+        "type": question["type"],
     }
 
     # Only include options for choice/scale questions
     if "options" in question and isinstance(question["options"], dict):
-        payload["next"]["options"] = [
+        rendered["options"] = [
             {"key": k, "label": v["label"]} for k, v in question["options"].items()
         ]
 
     # (Nice) surface UI helpers for free_text
     if "hints" in question:
-        payload["next"]["hints"] = question["hints"]
+        rendered["hints"] = question["hints"]
     if "constraints" in question:
-        payload["next"]["constraints"] = question["constraints"]
+        rendered["constraints"] = question["constraints"]
 
-    return payload
+    return rendered
 
+# Helper to parse a numeric score from "10 - Hurts worst" to an Integer (10) for computational purposes
+def _parse_scale(label: str) -> Optional[int]:
+    m = re.match(r"\s*(\d+)\b", label or "")
+    return int(m.group(1)) if m else None
 
-START_ID = "q1"
+def _parse_next(section: str, target: Optional[str]) -> Tuple[Optional[str], Optional[str]]:
+    # "GOTO:section:qid" jumps sections, None/"END" finishes the survey, anything else is a qid in the same section
+    if target is None or target == "END":
+        return None, None
+    if target.startswith("GOTO:"):
+        _, target_section, target_qid = target.split(":", 2)
+        return target_section, target_qid
+    return section, target
+
+class _StepError(Exception): # raised by a node's advance(); the handler attaches meta and turns it into an _ERR response
+    def __init__(self, name: str, **fmt):
+        self.name = name
+        self.fmt = fmt
+
+def _make_advance(qid: str, qtype: str, text: str, needs_iso_date: bool, transitions: dict, option_table: dict):
+    # Specialize the evaluate step for one node at import: the type/date branches are decided here, once,
+    # so each history step is a single call returning (answer record, parsed next).
+    if qtype == "free_text":
+        target = transitions[None]
+        if needs_iso_date:
+            def advance(answer):
+                stripped = answer.strip() if isinstance(answer, str) else None
+                if not stripped:
+                    raise _StepError("MISSING_ANSWER", qid=qid, text=text)
+                if not _is_iso_date(stripped):
+                    raise _StepError("DATE_FORMAT")
+                return {"type": "free_text", "value": stripped}, target
+        else:
+            def advance(answer):
+                stripped = answer.strip() if isinstance(answer, str) else None
+                if not stripped:
+                    raise _StepError("MISSING_ANSWER", qid=qid, text=text)
+                return {"type": "free_text", "value": stripped}, target
+    elif qtype in ("single_choice", "scale"):
+        lookup = option_table.get
+        intern = sys.intern
+        def advance(answer):
+            if not isinstance(answer, str) or not answer.strip():
+                raise _StepError("MISSING_ANSWER", qid=qid, text=text)
+            entry = lookup(intern(answer))  # option keys in the definition are interned at load
+            if entry is None:
+                raise _StepError("INVALID_ANSWER_KEY", key=answer, qid=qid)
+            return entry
+    else:
+        def advance(answer):
+            raise _StepError("UNSUPPORTED_TYPE_ON", qtype=qtype, qid=qid)
+    return advance
+
+@dataclass(slots=True, frozen=True)
+class QNode: # fixed-shape, read-only view of one definition node used by the request handlers
+    id: str
+    text: str
+    type: str
+    next: Optional[str]
+    options: Optional[dict]
+    hints: Optional[dict]
+    constraints: Optional[dict]
+    needs_iso_date: bool    # free_text answer must be YYYY-MM-DD
+    rendered: dict          # the pre-rendered "next" block; shared between requests, never mutate it
+    transitions: dict       # answer key (None for free_text) -> parsed (section, qid); (None, None) ends the survey
+    option_table: dict      # option key -> (answer record, parsed transition); one .get validates and resolves an answer
+    advance: Callable       # answer -> (answer record, parsed transition), raises _StepError; used by /survey/evaluate
+
+def _build_node(section: str, question) -> QNode:
+    constraints = question.get("constraints")
+    needs_iso_date = question["type"] == "free_text" and (
+        question["id"] == "q1a" or (constraints or {}).get("pattern") == "ISO_YYYY_MM_DD"
+    )
+    # GOTO/END strings are parsed here once, never per request
+    if question["type"] == "free_text":
+        transitions = {None: _parse_next(section, question.get("next"))}
+    else:
+        transitions = {key: _parse_next(section, opt["next"]) for key, opt in question.get("options", {}).items()}
+    option_table = {}
+    for key, opt in question.get("options", {}).items():
+        record = {"type": question["type"], "key": key, "label": opt["label"]}  # read-only, shared by every /survey/evaluate call
+        if question["type"] == "scale":
+            record["score"] = _parse_scale(opt["label"])
+        option_table[key] = (record, transitions[key])
+    return QNode(
+        id=question["id"],
+        text=question["text"],
+        type=question["type"],
+        next=question.get("next"),
+        options=question.get("options"),
+        hints=question.get("hints"),
+        constraints=constraints,
+        needs_iso_date=needs_iso_date,
+        rendered=_render_question(question),
+        transitions=transitions,
+        option_table=option_table,
+        advance=_make_advance(question["id"], question["type"], question["text"], needs_iso_date, transitions, option_table),
+    )
+
+# Flat lookups keyed by (section, qid): one hash lookup per access instead of chained dict indexing.
+# _NEXT_INDEX holds every transition already parsed; free_text nodes use answer key None.
+_NODE_INDEX = {
+    (section, qid): _build_node(section, node)
+    for section, questions in SURVEY_DEFINITION.items()
+    for qid, node in questions.items()
+}
+_NEXT_INDEX = {
+    (section, qid, key): target
+    for (section, qid), node in _NODE_INDEX.items()
+    for key, target in node.transitions.items()
+}
 
-@router.post("/survey/next")    # Primary route: advances one question forward
-def survey_next(request: SurveyRequest):
-    active_section = "min_criteria"
-    
+# /survey/next is deterministic apart from meta: every valid transition maps to a fixed ("next" block, done, section)
+# triple; section is where the next question lives (GOTO targets change it), None when the survey ends.
+# Transitions whose target is missing are left out, so a lookup miss falls through to the error checks.
+_NEXT_PAYLOAD = {
+    transition_key: (None, True, None) if target[0] is None else (_NODE_INDEX[target].rendered, False, target[0])
+    for transition_key, target in _NEXT_INDEX.items()
+    if target[0] is None or target in _NODE_INDEX
+}
 
-    if request.question_id is None:    # The Pydantic model (SurveyRequest) has two fields: question_id and answer which are both Optional[str]
-        current = SURVEY_DEFINITION[active_section][START_ID]   
-        return show_question(current)
-    
-    qmap = SURVEY_DEFINITION[active_section]     # local alias for the questions map
-    qid = request.question_id   # the question the client claims they just answered
-
-    if qid not in qmap:     # guard: unknown question id
-        raise HTTPException(
-            status_code=400,
-            detail={
-                "error": {"code": "UNKNOWN_QUESTION", "message": "Invalid question ID: " + qid}, 
-                "meta": build_meta()}
-        )
+def show_question_cached(section: str, qid: str, meta: dict) -> dict: # the question's pre-rendered "next" payload
+    return {"next": _NODE_INDEX[(section, qid)].rendered, "done": False, "meta": meta}
+
+
+START_ID = "q1"
+_NEXT_SECTION_DEFAULT = "min_criteria_questions" # /survey/next starts here when the body names no section
+
+# response_model=None + returning ORJSONResponse directly: FastAPI skips jsonable_encoder/validation
+# and orjson serializes the (already JSON-safe) payload
+@router.post("/survey/next", response_model=None, openapi_extra=_request_body(SurveyRequest, required=False))    # Primary route: advances one question forward
+async def survey_next(request: Request):
+    meta = cached_meta() # one timestamp per request, shared by every response/error below
+
+    # The body is three optional strings (SurveyRequest): parse it with orjson and check the types by hand
+    # instead of running it through FastAPI/pydantic validation.
+    raw = await request.body()
+    try:
+        body = orjson.loads(raw) if raw else {}
+    except orjson.JSONDecodeError:
+        body = None
+    if not isinstance(body, dict):
+        _raise("INVALID_BODY", meta)
+    section = body.get("section")
+    question_id = body.get("question_id")
+    answer = body.get("answer")
+    if (not (section is None or isinstance(section, str)) or not (question_id is None or isinstance(question_id, str))
+            or not (answer is None or isinstance(answer, str))):
+        _raise("INVALID_BODY", meta)
+
+    # The endpoint is stateless: after a GOTO the client sends back the "section" it was given,
+    # otherwise question ids (which repeat across sections) would resolve against the wrong section.
+    active_section = _NEXT_SECTION_DEFAULT if section is None else sys.intern(section)
+    if active_section not in SURVEY_DEFINITION:
+        _raise("UNKNOWN_SECTION", meta, section=active_section)
+
+    if question_id is None:    # no answer yet: the section's first question
+        start = _NODE_INDEX.get((active_section, START_ID))
+        if start is None:    # the section is defined but has no questions (yet)
+            _raise("EMPTY_SECTION", meta, section=active_section, qid=START_ID)
+        return ORJSONResponse({"next": start.rendered, "done": False, "section": active_section, "meta": meta})
     
-    current = qmap[qid]     # the node we are validating/advancing from 
+    qid = sys.intern(question_id)   # the question the client claims they just answered (interned: definition keys are too)
+    current = _NODE_INDEX.get((active_section, qid))     # the node we are validating/advancing from
 
-    #[current] is the node object for the question-id while current = qmap[qid] gives us the full dictionary for any specific question.
+    if current is None:     # guard: unknown question id
+        _raise("UNKNOWN_QUESTION", meta, qid=qid)
 
-    if current["type"] == "free_text":    # has to be handled before single choice and scale so nothing triggers to early
-        ans_text = request.answer # read answer from the request, not input()
+    if current.type == "free_text":    # has to be handled before single choice and scale so nothing triggers to early
+        ans_text = answer # read answer from the request, not input()
 
         if ans_text is None or not isinstance(ans_text, str) or not ans_text.strip():
-            raise HTTPException (
-                status_code=400,
-                detail={
-                    "error": {"code": "MISSING_ANSWER", "message": f"Missing answer for {qid}: {current['text']}"},
-                    "meta": build_meta()
-                }
-            )
-        
-        needs_iso_date = current["id"] == "q1a" or current.get("constraints", {}).get("pattern") == "ISO_YYYY_MM_DD"
-        if needs_iso_date and not re.fullmatch(r"\d{4}-\d{2}-\d{2}", ans_text.strip()):     # guard: incorrect date format
-            raise HTTPException (
-                status_code=400,
-                detail={
-                    "error": {"code": "DATE_FORMAT", "message": "Use YYYY-MM-DD (e.g., 2025-09-01)"},
-                    "meta": build_meta()
-                }
-            )
+            _raise("MISSING_ANSWER", meta, qid=qid, text=current.text)
         
-        # follow node-level next
-        next_qid = current.get("next")
-        if next_qid is None or next_qid == "END":    # if none, survey ends here
-            return {"next": None, "done": True, "meta": build_meta()}
+        if current.needs_iso_date and not _is_iso_date(ans_text.strip()):     # guard: incorrect date format
+            _raise("DATE_FORMAT", meta)
         
-        if next_qid not in qmap:
-            raise HTTPException(
-                status_code=500,
-                detail={
-                    "error": {"code": "BROKEN_DEFINITION",
-                              "message": f"free_text '{qid}' points to unknown question '{next_qid}'"},
-                    "meta": build_meta()
-                }
-            )
+        # follow node-level next (done=True when the survey ends here)
+        cached = _NEXT_PAYLOAD.get((active_section, qid, None))
+        if cached is None:
+            next_section, next_qid = _NEXT_INDEX[(active_section, qid, None)]
+            _raise("BROKEN_FREE_TEXT_NEXT", meta, qid=qid, next_qid=next_qid, next_section=next_section)
         
-        next_node = qmap[next_qid]
-        return show_question(next_node)
-
-    if current["type"] not in ("single_choice", "scale"):
-        raise HTTPException(
-            status_code=400,
-            detail={
-                "error": {"code": "UNSUPPORTED_TYPE", "message": f"Unsupported type {current['type']}"}, 
-                "meta": build_meta()}
-        )
+        return ORJSONResponse({"next": cached[0], "done": cached[1], "section": cached[2], "meta": meta})
+
+    if current.type not in ("single_choice", "scale"):
+        _raise("UNSUPPORTED_TYPE", meta, qtype=current.type)
     
     
-    ans_key = request.answer
-    ans_options = current["options"]
+    ans_key = answer
+    if isinstance(ans_key, str):
+        ans_key = sys.intern(ans_key)
 
     if ans_key is None or not isinstance(ans_key, str) or ans_key.strip() == "":
-        raise HTTPException (
-            status_code=400,
-            detail={
-                "error": {"code": "MISSING_ANSWER", "message": "Missing answer for " + qid + ": " + current["text"]}, 
-                "meta": build_meta()}
-        )
-    if ans_key in ans_options:
-        next_qid = ans_options[ans_key]["next"]
-
-        if next_qid is None:
-            return {"next": None, "done": True, "meta": build_meta()}
-        
-        if next_qid not in qmap:
-            # Developer/Config error
-            raise HTTPException(
-                status_code=500,
-                detail={
-                "error": {
-                    "code": "BROKEN_DEFINITION",
-                    "message": f"Option '{ans_key}' on '{qid}' points to unknown question '{next_qid}'"
-                },
-            "meta": build_meta()
-            }
-        )
-        
-        next_node = qmap[next_qid]  # safe next node
-        return show_question(next_node) # present the node
+        _raise("MISSING_ANSWER", meta, qid=qid, text=current.text)
+    cached = _NEXT_PAYLOAD.get((active_section, qid, ans_key))
+    if cached is not None:  # present the (safe) next node, possibly in another section, or finish
+        return ORJSONResponse({"next": cached[0], "done": cached[1], "section": cached[2], "meta": meta})
 
-    else:
-        raise HTTPException (
-            status_code=400,
-            detail={"error": {"code": "INVALID_ANSWER", "message": "Answer not allowed for " + qid}, "meta": build_meta()}
-        )
+    target = current.transitions.get(ans_key)
+    if target is not None:
+        # Developer/Config error: the option exists but points nowhere
+        _raise("BROKEN_OPTION_NEXT", meta, key=ans_key, qid=qid, next_qid=target[1], next_section=target[0])
+
+    _raise("INVALID_ANSWER", meta, qid=qid)
     
-class HistoryStep(BaseModel):
+class HistoryStep(TypedDict):
     question_id: str
     answer: str
         
-class EvaluateRequest(BaseModel):
+class EvaluateRequest(TypedDict):
     history: List[HistoryStep]
 
-# Helper to parse a numeric score from "10 - Hurts worst" to an Integer (10) for computational purposes
-def _parse_scale(label: str) -> Optional[int]:
-    m = re.match(r"\s*(\d+)\b", label or "")
-    return int(m.group(1)) if m else None
-
 def _build_summary(answers_by_id: dict) -> dict:
-    if "q1a" in answers_by_id:
+    get = answers_by_id.get   # one lookup per answer; no throwaway {} defaults
+    q1a = get("q1a")
+    q1b = get("q1b")
+    if q1a is not None:
         started_at_precision = "exact"
-        started_at_value = answers_by_id["q1a"]["value"]
+        started_at_value = q1a["value"]
     
-    elif "q1b" in answers_by_id:
+    elif q1b is not None:
         started_at_precision = "approx"
-        started_at_value = answers_by_id["q1b"]["value"]
+        started_at_value = q1b["value"]
     
     else:
         started_at_precision = None
         started_at_value = None
     
     # still pain
-    still_pain = None
-
-    if "q2" in answers_by_id:
-        still_pain = answers_by_id["q2"]["key"] == "a" # only true if patient answers "a" for q2. (still_pain = True)
+    q2 = get("q2")
+    still_pain = q2["key"] == "a" if q2 is not None else None # only true if patient answers "a" for q2. (still_pain = True)
 
     # pain_quality (label), pain_scale (number)
-    pain_quality = answers_by_id.get("q4", {}).get("label")
-    pain_scale = answers_by_id.get("q5", {}).get("score")
+    q4 = get("q4")
+    q5 = get("q5")
+    pain_quality = q4.get("label") if q4 is not None else None
+    pain_scale = q5.get("score") if q5 is not None else None
 
     requires_attention = bool(pain_scale is not None and pain_scale >= 8)
 
@@ -732,135 +386,70 @@ def _build_summary(answers_by_id: dict) -> dict:
         "requires_attention": requires_attention,
     }
 
-@router.post("/survey/evaluate")
-def evaluate_survey_progress(request: EvaluateRequest):
-    qmap = SURVEY_DEFINITION["abdominal_questions"]
+_EVAL_SECTION = "abdominal_questions"
+# An empty history always gets the section's first question; only meta differs per request
+_EVAL_EMPTY_NEXT = _NODE_INDEX[(_EVAL_SECTION, START_ID)].rendered
+
+@router.post("/survey/evaluate", response_model=None, openapi_extra=_request_body(EvaluateRequest, required=True))
+async def evaluate_survey_progress(request: Request):
+    # EvaluateRequest body parsed with orjson: no model/TypedDict validation pass over the whole history,
+    # each step is type-checked inside the loop below as it is consumed
+    raw = await request.body()
+    try:
+        body = orjson.loads(raw)
+    except orjson.JSONDecodeError:
+        body = None
+    steps = body.get("history") if isinstance(body, dict) else None # array of steps
+    if not isinstance(steps, list):
+        _raise("INVALID_HISTORY", cached_meta())
+    if not steps:   # Nothing answered yet -> tell client what to ask first
+        return ORJSONResponse({"next": _EVAL_EMPTY_NEXT, "done": False, "meta": cached_meta()})
+
+    meta = cached_meta() # one timestamp per request, shared by every response/error below
+    section = _EVAL_SECTION
 
     answers_by_id = {}
     # cursor is a single source of truth for expected position
     cursor = START_ID # "q1" default
-    steps = request.history # array of steps
-
-    if not request.history:
-        return show_question(qmap[cursor]) # Consumed all steps: not finished -> tell client what to ask next
 
-        
+    node_index = _NODE_INDEX   # bound once: the loop runs per history step
 
     for step in steps:
-        if step.question_id != cursor:
-            raise HTTPException (
-                status_code=400,
-                detail={
-                    "error":{"code": "FLOW_DIVERGENCE", "message": f"Expected '{cursor}', got '{step.question_id}'"}, 
-                    "meta": build_meta()
-                }
-            )
+        if not isinstance(step, dict):
+            _raise("INVALID_HISTORY", meta)
+        question_id = step.get("question_id")
+        answer = step.get("answer")
+        if not isinstance(question_id, str) or not isinstance(answer, str):
+            _raise("INVALID_HISTORY", meta)
+
+        if question_id != cursor:
+            _raise("FLOW_DIVERGENCE", meta, cursor=cursor, qid=question_id)
         
-        if cursor not in qmap:
-            raise HTTPException(
-                status_code=500,
-                detail={"error": {"code": "BROKEN_DEFINITION", "message": f"Missing node for expected cursor '{cursor}'"},
-                        "meta": build_meta()
-                }
-            )
-
-
-        node = qmap[cursor]
-
-        qtype = node["type"]
-        if qtype == "free_text":
-            val = step.answer
-            if val is None or not isinstance(val, str) or not val.strip():
-                raise HTTPException(
-                    status_code=400,
-                    detail={
-                        "error": {
-                            "code": "MISSING_ANSWER",
-                            "message": f"Missing answer for {cursor}: {node['text']}"
-                        },
-                        "meta": build_meta(),
-                    },
-                )
-            # q1a exact-date formatting
-            if node["id"] == "q1a" and not re.fullmatch(r"\d{4}-\d{2}-\d{2}", val.strip()):
-                raise HTTPException(
-                    status_code=400,
-                    detail={
-                        "error": {"code": "DATE_FORMAT",
-                                  "message": "Use YYYY-MM-DD (e.g., 2025-09-01)"},
-                                  "meta": build_meta(),
-                    },
-                )
-            
-            answers_by_id[cursor] = {"type": "free_text", "value": val.strip()}
-            next_id = node.get("next")
-
-        elif qtype in ("single_choice", "scale"):
-            key = step.answer
-            if key is None or not isinstance(key, str) or not key.strip():
-                raise HTTPException(
-                    status_code=400, 
-                    detail={
-                        "error":{
-                            "code": "MISSING_ANSWER",
-                            "message": f"Missing answer for {cursor}: {node['text']}"
-                        },
-                        "meta": build_meta(),
-                    }
-                )
-            
-            opts = node["options"]
-
-            if key not in opts:     # if answer key is not an option, raise an error
-                raise HTTPException(
-                    status_code=400,
-                    detail={
-                        "error": {"code": "INVALID_ANSWER",
-                                  "message": f"Answer key '{key}' not allowed for {cursor}"},
-                                  "meta": build_meta(),
-                    },
-                )
-            
-            opt = opts[key]
-            record = {"type":qtype, "key": key, "label": opt["label"]}
-
-            if qtype == "scale":     # if the question type = scale, then add logic to the said scale using the parse scale function.
-                record["score"] = _parse_scale(opt["label"])
-            
-            answers_by_id[cursor] = record
-            next_id = opt["next"]
+        node = node_index.get((section, cursor))
+        if node is None:
+            _raise("BROKEN_CURSOR", meta, cursor=cursor)
+
+        try:
+            record, (next_section, next_id) = node.advance(answer)  # validate + record + next, specialized per node
+        except _StepError as err:
+            _raise(err.name, meta, **err.fmt)
+        answers_by_id[cursor] = record
 
-        else:
-            raise HTTPException(
-                status_code=400,
-                detail={
-                    "error": {"code": "UNSUPPORTED_TYPE",
-                              "message": f"Unsupported type {qtype} on {cursor}"},
-                              "meta": build_meta(),
-                },
-            )
         # 3 Advance or finish
-        if next_id is None:
-            return {
+        if next_section is None:
+            return ORJSONResponse({
                 "next": None,
                 "done": True,
                 "summary": _build_summary(answers_by_id),
-                "meta": build_meta(),
-            }
+                "meta": meta,
+            })
         
-        if next_id not in qmap:
-            raise HTTPException(
-                status_code=500,
-                detail={
-                    "error": {"code": "BROKEN_DEFINITION",
-                              "message": f"'{cursor}' points to unknown next '{next_id}'"},
-                              "meta": build_meta(),
-                },
-            )
+        if (next_section, next_id) not in node_index:
+            _raise("BROKEN_NEXT", meta, qid=cursor, next_qid=next_id, next_section=next_section)
         
-        cursor = next_id    # move to next node
+        section, cursor = next_section, next_id    # move to next node
         
-    return show_question(qmap[cursor])
+    return ORJSONResponse(show_question_cached(section, cursor, meta))
 
 
 
@@ -0,0 +1,20 @@
+# UTC timestamps shared by response meta (survey/runs) and stored run records
+import time
+from typing import Tuple
+
+# Last (epoch millisecond, stamp) pair. Calls landing in the same millisecond reuse the string;
+# the tuple is swapped in one assignment, so concurrent readers never see a half-updated pair.
+_LAST_STAMP: Tuple[int, str] = (-1, "")
+
+def utc_now_iso() -> str: # "YYYY-MM-DDTHH:MM:SS.mmmZ", same as datetime.isoformat(timespec="milliseconds") with a Z suffix
+    global _LAST_STAMP
+    ms = time.time_ns() // 1_000_000
+    cached_ms, cached_ts = _LAST_STAMP
+    if ms == cached_ms:
+        return cached_ts
+    sec, msec = divmod(ms, 1000)
+    tm = time.gmtime(sec)
+    ts = (f"{tm.tm_year:04d}-{tm.tm_mon:02d}-{tm.tm_mday:02d}"
+          f"T{tm.tm_hour:02d}:{tm.tm_min:02d}:{tm.tm_sec:02d}.{msec:03d}Z")
+    _LAST_STAMP = (ms, ts)
+    return ts
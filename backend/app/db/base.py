@@ -2,6 +2,7 @@ from datetime import datetime
 from typing import Optional, List, Dict, Any
 import uuid
 
-from sqlalchemy.orm import declarative_base
+from sqlalchemy.orm import DeclarativeBase
 
-Base = declarative_base()
\ No newline at end of file
+class Base(DeclarativeBase): # 2.0 typed declarative base: models declare Mapped[...] = mapped_column(...)
+    pass
@@ -3,7 +3,6 @@ from typing import Optional, List, Dict, Any
 import uuid
 import enum
 from sqlalchemy import (
-    Column,
     String,
     DateTime,
     ForeignKey,
@@ -12,11 +11,12 @@ from sqlalchemy import (
     Boolean,
     Text,
     Integer, 
-    Float
+    Float,
+    Index,
 )
 from sqlalchemy.dialects.postgresql import UUID
-from sqlalchemy.orm import relationship
-from sqlalchemy.sql import func
+from sqlalchemy.orm import Mapped, column_property, mapped_column, relationship
+from sqlalchemy.sql import func, select
 
 from app.db.base import Base
 
@@ -55,47 +55,75 @@ class SourceType(str, enum.Enum): # source ontology
 class Case(Base): # the "current state" record
     __tablename__ = "cases"
 
-    id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
+    id: Mapped[uuid.UUID] = mapped_column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
 
-    received_at = Column(DateTime(timezone=True), nullable=False, server_default=func.now())
+    received_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), nullable=False, server_default=func.now())
     # This should be set once and never overwritten; amendments happen via events.
-    initial_awareness_at = Column(DateTime(timezone=True), nullable=True)
+    initial_awareness_at: Mapped[Optional[datetime]] = mapped_column(DateTime(timezone=True), nullable=True)
 
-    status = Column(Enum(CaseStatus), nullable=False, default=CaseStatus.OPEN)
+    status: Mapped[CaseStatus] = mapped_column(Enum(CaseStatus), nullable=False, default=CaseStatus.OPEN)
 
     # convenient relationship to read event timeline
-    events = relationship(
+    events: Mapped[List["CaseEventLog"]] = relationship(
         "CaseEventLog",
         back_populates="case", 
         order_by="CaseEventLog.occurred_at.asc()",
         cascade="all, delete-orphan",
+        lazy="raise", # events must be eager-loaded explicitly; an accidental lazy load is an extra round trip
+    )
+
+    __table_args__ = (
+        # "latest case" reads the index tip; INCLUDE lets Postgres answer it without touching the heap
+        Index(
+            "ix_cases_received_at_desc",
+            received_at.desc(),
+            postgresql_include=["id", "initial_awareness_at", "status"],
+        ),
     )
 
 class CaseEventLog(Base): # the "history" record
     __tablename__ = "case_event_log"
 
-    id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
-    case_id = Column(UUID(as_uuid=True), ForeignKey("cases.id"), nullable=False, index=True)
+    id: Mapped[uuid.UUID] = mapped_column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
+    case_id: Mapped[uuid.UUID] = mapped_column(UUID(as_uuid=True), ForeignKey("cases.id"), nullable=False) # indexed by ix_case_event_log_case_occurred
 
-    event_type = Column(Enum(EventType), nullable=False)
-    occurred_at = Column(DateTime(timezone=True), nullable=False, server_default=func.now())
+    event_type: Mapped[EventType] = mapped_column(Enum(EventType), nullable=False)
+    occurred_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), nullable=False, server_default=func.now())
 
-    actor_type = Column(Enum(ActorType), nullable=False, default=ActorType.SYSTEM)
-    actor_id = Column(String, nullable=True) # user id, api key id, service id, etc.
+    actor_type: Mapped[ActorType] = mapped_column(Enum(ActorType), nullable=False, default=ActorType.SYSTEM)
+    actor_id: Mapped[Optional[str]] = mapped_column(String, nullable=True) # user id, api key id, service id, etc.
 
     # JSON payload should always include what changed and where it came from
-    payload = Column(JSON, nullable=False, default=dict)
+    payload: Mapped[Dict[str, Any]] = mapped_column(JSON, nullable=False, default=dict)
 
     # IN regulated mode, certain event types should require a reason
-    reason = Column(Text, nullable=True)
+    reason: Mapped[Optional[str]] = mapped_column(Text, nullable=True)
+
+    case: Mapped["Case"] = relationship("Case", back_populates="events")
 
-    case = relationship("Case", back_populates="events")
+    __table_args__ = (
+        # serves "events for a case, oldest first" as an index range scan with no sort step
+        Index("ix_case_event_log_case_occurred", "case_id", "occurred_at"),
+    )
+
+# "N events" without loading the timeline: a correlated COUNT answered from ix_case_event_log_case_occurred.
+# Deferred, so it only runs when a listing query asks for it with .options(undefer(Case.event_count));
+# raiseload turns an accidental access (an extra round trip per case) into an error, like Case.events.
+# Assigned after CaseEventLog exists because the subquery references it.
+Case.event_count = column_property(
+    select(func.count(CaseEventLog.id))
+    .where(CaseEventLog.case_id == Case.id)
+    .correlate_except(CaseEventLog)
+    .scalar_subquery(),
+    deferred=True,
+    raiseload=True,
+)
 
 class Patient(Base): # Key Constraint: Patient must be identifiable not necessarily by name but distinguishable enough in the report.
     __tablename__ = "patient"
 
-    patient_id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4) # internal no need for name, PV allows limited data
-    sex = Column(String, nullable=True) # male | female
-    age = Column(Integer, nullable=False)
-    weight = Column(Float, nullable=True)
+    patient_id: Mapped[uuid.UUID] = mapped_column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4) # internal no need for name, PV allows limited data
+    sex: Mapped[Optional[str]] = mapped_column(String, nullable=True) # male | female
+    age: Mapped[int] = mapped_column(Integer, nullable=False)
+    weight: Mapped[Optional[float]] = mapped_column(Float, nullable=True)
 
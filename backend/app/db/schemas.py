@@ -2,3 +2,27 @@
 from pydantic import BaseModel, Field
 from datetime import datetime
 from typing import Optional, List, Dict, Any
+
+
+# ---- /debug/latest response shape ----
+# Postgres builds the JSON document (json_build_object) and the endpoint returns its bytes as-is;
+# these models document the shape in OpenAPI and are never instantiated on the request path.
+
+class CaseOut(BaseModel):
+    id: str
+    received_at: datetime
+    initial_awareness_at: Optional[datetime] = None
+    status: str
+
+class EventOut(BaseModel):
+    id: str
+    event_type: str
+    occurred_at: datetime
+    actor_type: str
+    actor_id: Optional[str] = None
+    reason: Optional[str] = None
+    payload: Dict[str, Any] = Field(default_factory=dict)
+
+class LatestCaseOut(BaseModel):
+    case: Optional[CaseOut] = None
+    events: List[EventOut] = Field(default_factory=list)
@@ -2,8 +2,9 @@ from datetime import datetime
 from typing import Optional, List, Dict, Any
 import uuid
 import os
-from sqlalchemy import create_engine
-from sqlalchemy.orm import sessionmaker, Session
+import orjson
+from sqlalchemy.engine import make_url, URL
+from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker, AsyncSession
 from fastapi import Depends
 from dotenv import load_dotenv
 load_dotenv()
@@ -11,12 +12,40 @@ DATABASE_URL = os.getenv("DATABASE_URL")
 if not DATABASE_URL:
     raise RuntimeError("DATABASE_URL is not set. Create backend/.env or export it in your shell.")
 
-engine = create_engine(DATABASE_URL, pool_pre_ping=True)
-SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+def _async_url(url: str) -> URL: # same database, asyncpg driver (DATABASE_URL is usually postgresql+psycopg2://...)
+    async_url = make_url(url).set(drivername="postgresql+asyncpg")
+    query = dict(async_url.query)
+    if "sslmode" in query: # asyncpg spells libpq's sslmode as ssl
+        query["ssl"] = query.pop("sslmode")
+    return async_url.set(query=query)
 
-def get_db():
-    db = SessionLocal()
-    try:
+# All database access is async (asyncpg): the event loop stays free while a query is in flight,
+# so DB-bound requests never block other requests on the same worker
+# Pool sizing is per worker process; tune with DB_POOL_SIZE / DB_MAX_OVERFLOW so workers * (size + overflow)
+# stays under the server's max_connections. pool_recycle drops connections before server-side idle timeouts.
+engine = create_async_engine(
+    _async_url(DATABASE_URL),
+    pool_pre_ping=True,
+    pool_size=int(os.getenv("DB_POOL_SIZE", "20")),
+    max_overflow=int(os.getenv("DB_MAX_OVERFLOW", "10")),
+    pool_recycle=int(os.getenv("DB_POOL_RECYCLE", "3600")),
+    pool_timeout=30,
+    # JSON columns (CaseEventLog.payload) encode/decode with orjson; asyncpg's json codec wants str, not bytes
+    json_serializer=lambda obj: orjson.dumps(obj).decode(),
+    json_deserializer=orjson.loads,
+)
+# expire_on_commit=False: reading an attribute after commit must not trigger a hidden refresh SELECT
+# (with AsyncSession that refresh would be implicit IO, which raises)
+SessionLocal = async_sessionmaker(bind=engine, autoflush=False, expire_on_commit=False)
+# Read-only routes share the same pool but run in autocommit: no BEGIN/ROLLBACK round trips around their SELECTs
+ReadSessionLocal = async_sessionmaker(
+    bind=engine.execution_options(isolation_level="AUTOCOMMIT"), autoflush=False, expire_on_commit=False,
+)
+
+async def get_db():
+    async with SessionLocal() as db:
         yield db
-    finally:
-        db.close()
\ No newline at end of file
+
+async def get_read_db(): # never commit through this one
+    async with ReadSessionLocal() as db:
+        yield db
\ No newline at end of file
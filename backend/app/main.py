@@ -3,26 +3,49 @@
 # Goal: boot a server so we know our toolchain works
 # ------------------------------
 import os
+from contextlib import asynccontextmanager
 # Import FastAPI class to create the web app
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.middleware.gzip import GZipMiddleware
+from fastapi.responses import ORJSONResponse
 from app.api import survey
 from app.routes.runs import router as runs_router
 from app.api.debug import router as debug_router
+from app.db.session import engine
 from dotenv import load_dotenv
 load_dotenv(dotenv_path=".env")
 print("DATABASE_URL loaded?", bool(os.getenv("DATABASE_URL")))
+# Close pooled DB connections cleanly when the server stops (instead of leaving them to the server's timeout)
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    yield
+    await engine.dispose()
+
 # Create an application instance.
 # 'app' is what Uvicorn looks for when you run: uvicorn app.main:app --reload
 app = FastAPI(
     title="Abdominal Survey API",          # Shows up in docs
-    version="0.1.0"                        # Semantic version for your service
+    version="0.1.0",                       # Semantic version for your service
+    default_response_class=ORJSONResponse, # Routes returning dicts are encoded with orjson (same as the DB JSON columns), not stdlib json
+    lifespan=lifespan,
 )
 
-# Allow the lightweight dashboard (served from a static file server) to call the API
+# Compress larger JSON bodies (survey "next" payloads, summaries); tiny responses aren't worth the CPU.
+# Added before CORS so CORS stays the outermost layer and answers preflights without touching gzip.
+app.add_middleware(GZipMiddleware, minimum_size=1024, compresslevel=6)
+
+# Allow the lightweight dashboard (served from a static file server) to call the API.
+# Browsers reject "*" together with credentials, so origins are listed explicitly;
+# CORS_ORIGINS is a comma-separated list (default: the dashboard's `npm run dev` port).
+CORS_ORIGINS = [
+    origin.strip()
+    for origin in os.getenv("CORS_ORIGINS", "http://localhost:3000,http://127.0.0.1:3000").split(",")
+    if origin.strip()
+]
 app.add_middleware(
     CORSMiddleware,
-    allow_origins=["*"],  # Dev-friendly: accept all origins so any local port works
+    allow_origins=CORS_ORIGINS,
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
@@ -49,4 +72,21 @@ def root():
 # - The goal is to confirm your dev environment is set up before we add complexity.
 app.include_router(survey.router, prefix="/api")
 app.include_router(runs_router, prefix="/api")
-app.include_router(debug_router)
\ No newline at end of file
+app.include_router(debug_router)
+
+# Production-style entry point: python -m app.main
+# uvloop + httptools come with uvicorn[standard]; uvloop has no Windows build, so Windows dev machines keep asyncio.
+# WEB_CONCURRENCY defaults to 1 worker: without REDIS_URL, survey runs live in an in-process store, so a run
+# created by one worker would be unknown to the others. Set REDIS_URL before raising it.
+if __name__ == "__main__":
+    import sys
+    import uvicorn
+
+    uvicorn.run(
+        "app.main:app",
+        host=os.getenv("HOST", "0.0.0.0"),
+        port=int(os.getenv("PORT", "8000")),
+        loop="asyncio" if sys.platform == "win32" else "uvloop",
+        http="httptools",
+        workers=int(os.getenv("WEB_CONCURRENCY", "1")),
+    )
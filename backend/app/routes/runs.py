@@ -1,8 +1,7 @@
 # _____ uses survey.py (engine) + storage.py (persistence) to provide stateful run endpoints
 
 from typing import Optional
-from uuid import uuid4
-import base64
+from secrets import token_urlsafe
 
 from fastapi import APIRouter, HTTPException
 from pydantic import BaseModel
@@ -11,19 +10,21 @@ from pydantic import BaseModel
 from app.api.survey import (
     START_ID,                      # the first question id (e.g., "q1")
     SURVEY_DEFINITION,            # the full question graph (dict)
-    show_question,                # formats a node into the frontend-friendly "next" payload
-    build_meta,                   # meta block with version + timestamp
+    cached_meta,                  # meta block with version + timestamp (shared per millisecond; don't mutate)
     _build_summary,               # builds a summary dict from answers_by_id
+    _NEXT_INDEX,                  # (section, qid, answer key | None) -> parsed (section, qid) transition
+    _NODE_INDEX,                  # (section, qid) -> QNode (node.rendered is the frontend-friendly "next" payload)
+    _is_iso_date,                 # YYYY-MM-DD check shared with survey_next
 )
 
-# process-wide, thread-safe in-memory store
-from app.services.storage import InMemoryRunStore, SurveyRun
+# run store: Redis when REDIS_URL is set (shared by all workers), otherwise process-wide, thread-safe in-memory
+from app.services.storage import make_run_store, RunConflict, SurveyRun
 from app.core.config import SURVEY_VERSION
 
 router = APIRouter()
 
 # One store instance per process
-STORE = InMemoryRunStore()
+STORE = make_run_store()
  
 
 # ---------- helpers ----------
@@ -31,9 +32,9 @@ STORE = InMemoryRunStore()
 def _new_run_id() -> str:
     """
     Generate a URL-safe short id from 16 random bytes.
-    Example: 'f2q4...-' (~22 chars).
+    Example: 'f2q4...-' (22 chars).
     """
-    return base64.urlsafe_b64encode(uuid4().bytes).rstrip(b"=").decode("ascii")
+    return token_urlsafe(16)
 
 
 def _require_run(run_id: str) -> SurveyRun:
@@ -46,7 +47,7 @@ def _require_run(run_id: str) -> SurveyRun:
             status_code=404,
             detail={
                 "error": {"code": "UNKNOWN_RUN", "message": f"Run '{run_id}' not found."},
-                "meta": build_meta(),
+                "meta": cached_meta(),
             },
         )
     return run
@@ -61,46 +62,74 @@ def _require_active(run: SurveyRun) -> None:
             status_code=409,
             detail={
                 "error": {"code": "STATUS_INACTIVE", "message": f"Run is {run.get('status')}."},
-                "meta": build_meta(),
+                "meta": cached_meta(),
             },
         )
 
-# ---------- Comment this function out for now ---------
-"""def _build_answer_log(run_id: str):
-
-    Based off of the run_id, any question that has already been answered will 
-    be stored in local memory for now until database is set up.
-
-    run = STORE.get_run(run_id)
-    _require_run(run_id)
+def _persist_answer(run: SurveyRun, cursor: str, active_section: str, record: dict, step: dict, /, **changes) -> None:
+    # positional-only: changes may themselves carry cursor= / active_section=
+    """
+    Write one answered step, but only if the run is still where this request found it.
+    A concurrent answer to the same step that committed first turns this one into a 409.
+    """
+    try:
+        STORE.append_answer(run["run_id"], cursor, record, step, expected_section=active_section, **changes)
+    except RunConflict:
+        raise HTTPException(
+            status_code=409,
+            detail={
+                "error": {
+                    "code": "FLOW_DIVERGENCE",
+                    "message": f"Run already moved past '{cursor}'; reload it before answering.",
+                },
+                "meta": cached_meta(),
+            },
+        )
 
+def _build_answer_log(run: SurveyRun) -> list:
+    """
+    Stitch every answered step of a run into one record, in answer order.
+    A single pass over history: each step carries its section, so the node is one
+    (section, qid) lookup and the answer record is resolved from that node directly
+    (answers_by_id is keyed by qid alone, which repeats across sections).
+    """
     results = []
 
-    ans_id = run["answers_by_id"]
-    history = run["history"]
-
-    for step in history:
+    for step in run["history"]:
         qid = step["question_id"]
-        node = QMAP.get(qid)
-        stored = run["answers_by_id"].get(qid)
+        section = step.get("section")   # runs stored before steps carried a section resolve to MISSING
+        node = _NODE_INDEX.get((section, qid))
+
+        if node is None:
+            answer = None
+        elif node.type == "free_text":
+            answer = {"type": "free_text", "value": step["answer"].strip()}
+        else:
+            entry = node.option_table.get(step["answer"].strip())
+            answer = entry[0] if entry else None
 
         # build one stitched record per history item
-        record = {
+        results.append({
             "question_id": qid,
-            "question_text": node["text"] if node else "MISSING",
-            "type": node["type"] if node else None,
-            "answer": stored or {"incomplete": True}
-        }
-        results.append(record)
+            "section": section,
+            "question_text": node.text if node else "MISSING",
+            "type": node.type if node else None,
+            "answer": answer or {"incomplete": True},
+        })
 
-        return results"""
+    return results
 
 def _cursor_to_node(cursor: Optional[str], active_section):
     """
-    Convert a cursor id to a node dict, with guardrails.
+    Convert a cursor id to its QNode, with guardrails.
     - If cursor is None -> no next question (likely finished).
     - If cursor not in qmap/section map -> definition error (500).
     """
+    if cursor is not None:
+        node = _NODE_INDEX.get((active_section, cursor)) # one flat lookup on the hot path
+        if node is not None:
+            return node
+
     if active_section not in SURVEY_DEFINITION: # if a bad section is caught
         raise HTTPException(
             status_code=500,
@@ -111,22 +140,19 @@ def _cursor_to_node(cursor: Optional[str], active_section):
                 }
             }
         )
-    qmap = SURVEY_DEFINITION[active_section] # section aware
 
     if cursor is None:
         return None
-    if cursor not in qmap:
-        raise HTTPException(
-            status_code=500,
-            detail={
-                "error": {
-                    "code": "BROKEN_DEFINITION",
-                    "message": f"Cursor '{cursor}' not found in SURVEY_DEFINITION.",
-                },
-                "meta": build_meta(),
+    raise HTTPException(
+        status_code=500,
+        detail={
+            "error": {
+                "code": "BROKEN_DEFINITION",
+                "message": f"Cursor '{cursor}' not found in SURVEY_DEFINITION.",
             },
-        )
-    return qmap[cursor]
+            "meta": cached_meta(),
+        },
+    )
 
 
 # ---------- request models ----------
@@ -167,15 +193,15 @@ def begin_run():
     STORE.create_run(record)
     node = _cursor_to_node(cursor, record["active_section"])
 
-    # Format the node as a "next" payload for the client
-    next_payload = show_question(node)["next"]
+    # The node's "next" payload for the client (pre-rendered at import)
+    next_payload = node.rendered
 
     return {
         "run_id": run_id,
         "done": False,
         "next": next_payload,
         "version": SURVEY_VERSION,
-        "meta": build_meta(),
+        "meta": cached_meta(),
     }
 
 
@@ -188,7 +214,6 @@ def resume_run(req: ResumeRequest):
     """
     run = _require_run(req.run_id)      # 404 if missing
     active_section = run["active_section"]
-    qmap = SURVEY_DEFINITION[active_section]
 
     status = run["status"]
     cursor = run.get("cursor")
@@ -200,7 +225,7 @@ def resume_run(req: ResumeRequest):
             "next": None,
             "summary": run.get("summary"),
             "version": run["version"],
-            "meta": build_meta(),
+            "meta": cached_meta(),
         }
 
     if status == "cancelled":
@@ -210,19 +235,19 @@ def resume_run(req: ResumeRequest):
             "next": None,
             "summary": None,
             "version": run["version"],
-            "meta": build_meta(),
+            "meta": cached_meta(),
         }
 
     # Active: we must have a valid cursor pointing at a node
     node = _cursor_to_node(cursor=cursor, active_section=active_section)
-    next_payload = show_question(node)["next"]
+    next_payload = node.rendered
 
     return {
         "run_id": run["run_id"],
         "done": False,
         "next": next_payload,
         "version": run["version"],
-        "meta": build_meta(),
+        "meta": cached_meta(),
     }
 
 
@@ -238,7 +263,6 @@ def answer_question(req: AnswerRequest):
     _require_active(run)
 
     active_section = run["active_section"]
-    qmap = SURVEY_DEFINITION[active_section]
 
     cursor = run.get("cursor")
     node = _cursor_to_node(cursor=cursor, active_section=active_section)  # validates presence in qmap/active section map, unless None
@@ -252,12 +276,12 @@ def answer_question(req: AnswerRequest):
                     "code": "FLOW_DIVERGENCE",
                     "message": f"Expected to answer '{cursor}', got '{req.question_id}'.",
                 },
-                "meta": build_meta(),
+                "meta": cached_meta(),
             },
         )
 
     # 2) Apply the same validation/transition rules you used in survey_next
-    qtype = node["type"]
+    qtype = node.type
 
     # Free text node: answer is a string value; next is node-level "next"
     if qtype == "free_text":
@@ -267,28 +291,27 @@ def answer_question(req: AnswerRequest):
                 status_code=400,
                 detail={
                     "error": {"code": "MISSING_ANSWER", "message": f"Missing answer for {cursor}."},
-                    "meta": build_meta(),
+                    "meta": cached_meta(),
                 },
             )
 
-        # Example: q1a must be YYYY-MM-DD (you implemented the same rule in survey_next)
-        if node["id"] == "q1a":
-            import re
-            if not re.fullmatch(r"\d{4}-\d{2}-\d{2}", val):
+        # Example: q1a must be YYYY-MM-DD (same rule and same precomputed flag as survey_next)
+        if node.needs_iso_date:
+            if not _is_iso_date(val):
                 raise HTTPException(
                     status_code=400,
                     detail={
                         "error": {"code": "DATE_FORMAT", "message": "Use YYYY-MM-DD (e.g., 2025-09-01)"},
-                        "meta": build_meta(),
+                        "meta": cached_meta(),
                     },
                 )
 
-        # Persist answer
-        answers = run["answers_by_id"]
-        answers[cursor] = {"type": "free_text", "value": val}
+        # Record answer (persisted below together with the cursor move)
+        record = {"type": "free_text", "value": val}
+        run["answers_by_id"][cursor] = record
 
         # Move to next (node-level)
-        next_id = node.get("next")
+        next_section, next_id = _NEXT_INDEX[(active_section, cursor, None)]
 
     # Choice/scale node: answer is an option key ("a", "b", ...)
     elif qtype in ("single_choice", "scale"):
@@ -298,35 +321,26 @@ def answer_question(req: AnswerRequest):
                 status_code=400,
                 detail={
                     "error": {"code": "MISSING_ANSWER", "message": f"Missing answer for {cursor}."},
-                    "meta": build_meta(),
+                    "meta": cached_meta(),
                 },
             )
 
-        opts = node["options"]
-        if key not in opts:
+        entry = node.option_table.get(key) # (answer record, parsed next), built at import
+        if entry is None:
             raise HTTPException(
                 status_code=400,
                 detail={
                     "error": {"code": "INVALID_ANSWER", "message": f"Answer '{key}' not allowed for {cursor}."},
-                    "meta": build_meta(),
+                    "meta": cached_meta(),
                 },
             )
 
-        opt = opts[key]
-        record = {"type": qtype, "key": key, "label": opt["label"]}
-
-        # If scale, also store a numeric score parsed from the label ("8 - Hurts Whole Lot" -> 8)
-        if qtype == "scale":
-            import re
-            m = re.match(r"\s*(\d+)\b", opt["label"])
-            record["score"] = int(m.group(1)) if m else None
+        # {"type", "key", "label"} plus, for scale, the numeric score parsed from the label at import
+        # ("8 - Hurts Whole Lot" -> 8). Shared and read-only: the store copies it on write.
+        record, (next_section, next_id) = entry
 
-        # Persist answer
-        answers = run["answers_by_id"]
-        answers[cursor] = record
-
-        # Next id comes from the option
-        next_id = opt["next"]
+        # Record answer (persisted below together with the cursor move)
+        run["answers_by_id"][cursor] = record
 
     else:
         # Unknown type -> definition error
@@ -334,20 +348,22 @@ def answer_question(req: AnswerRequest):
             status_code=400,
             detail={
                 "error": {"code": "UNSUPPORTED_TYPE", "message": f"Unsupported type '{qtype}' on {cursor}."},
-                "meta": build_meta(),
+                "meta": cached_meta(),
             },
         )
 
     # Append to history (lightweight audit trail)
-    run["history"].append({"question_id": cursor, "answer": req.answer or ""})
+    step = {"question_id": cursor, "section": active_section, "answer": req.answer or ""}
+    run["history"].append(step)
 
-    # 3) Finish or advance
-    if next_id is None:
+    # 3) Finish or advance (GOTO/END strings were parsed at import; None means the survey ends)
+    if next_section is None:
         # Mark the run completed and build a summary
         run["status"] = "completed"
         run["cursor"] = None
         run["summary"] = _build_summary(run["answers_by_id"])
-        STORE.replace_run(run)  # persist
+        # persist only this step's delta: the answer, the history entry and the changed fields
+        _persist_answer(run, cursor, active_section, record, step, status="completed", cursor=None, summary=run["summary"])
 
         return {
             "run_id": run["run_id"],
@@ -355,11 +371,11 @@ def answer_question(req: AnswerRequest):
             "next": None,
             "summary": run["summary"],
             "version": run["version"],
-            "meta": build_meta(),
+            "meta": cached_meta(),
         }
 
-    if isinstance(next_id, str) and next_id.startswith("GOTO:"):
-        _, target_section, target_qid = next_id.split(":", 2)
+    if next_section != active_section:
+        target_section, target_qid = next_section, next_id
 
         if target_section not in SURVEY_DEFINITION:
             raise HTTPException(
@@ -369,11 +385,11 @@ def answer_question(req: AnswerRequest):
                         "code": "BROKEN_DEFINITION",
                         "message": f"GOTO target section '{target_section}' not found.",
                     },
-                    "meta": build_meta(),
+                    "meta": cached_meta(),
                 },
             )
-        target_map = SURVEY_DEFINITION[target_section] # qmap just diff name for this case
-        if target_qid not in target_map:
+        next_node = _NODE_INDEX.get((target_section, target_qid))
+        if next_node is None:
             raise HTTPException(
                 status_code=500,
                 detail= {
@@ -381,29 +397,29 @@ def answer_question(req: AnswerRequest):
                         "code": "BROKEN_DEFINITION",
                         "message": f"GOTO target question '{target_qid}' not found in section '{target_section}'.",
                     },
-                    "meta": build_meta(),
+                    "meta": cached_meta(),
                 },
             )
         
         # Update the run state
         run["active_section"] = target_section
         run["cursor"] = target_qid
-        STORE.replace_run(run)
+        _persist_answer(run, cursor, active_section, record, step, active_section=target_section, cursor=target_qid)
 
-        # Load and return new node
-        next_node = target_map[target_qid] # node = qmap[cursor]
-        next_payload = show_question(next_node)["next"]
+        # Return the new node's pre-rendered payload
+        next_payload = next_node.rendered
 
         return {
             "run_id": run["run_id"],
             "done": False,
             "next": next_payload,
             "version": run["version"],
-            "meta": build_meta()
+            "meta": cached_meta()
         }
     
     # Ensure next exists in the graph
-    if next_id not in qmap:
+    next_node = _NODE_INDEX.get((active_section, next_id))
+    if next_node is None:
         raise HTTPException(
             status_code=500,
             detail={
@@ -411,27 +427,35 @@ def answer_question(req: AnswerRequest):
                     "code": "BROKEN_DEFINITION",
                     "message": f"'{cursor}' points to unknown next '{next_id}'.",
                 },
-                "meta": build_meta(),
+                "meta": cached_meta(),
             },
         )
 
     # Advance cursor and persist
     run["cursor"] = next_id
-    STORE.replace_run(run)
+    _persist_answer(run, cursor, active_section, record, step, cursor=next_id)
 
-    next_node = qmap[next_id]
-    next_payload = show_question(next_node)["next"]
+    next_payload = next_node.rendered
 
     return {
         "run_id": run["run_id"],
         "done": False,
         "next": next_payload,
         "version": run["version"],
-        "meta": build_meta(),
+        "meta": cached_meta(),
     }
 
 @router.get("/survey/runs/{run_id}/answers")
-def show_answer_history(req: AnswerRequest):
-    run = _require_run(req.run_id)
+def show_answer_history(run_id: str):
+    """
+    Return every answered step of a run (question text, type and answer), in answer order.
+    """
+    run = _require_run(run_id)      # 404 if missing
 
-    
+    return {
+        "run_id": run["run_id"],
+        "status": run["status"],
+        "answers": _build_answer_log(run),
+        "version": run["version"],
+        "meta": cached_meta(),
+    }
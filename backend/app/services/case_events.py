@@ -1,13 +1,38 @@
-from sqlalchemy.orm import Session # this function writes inside a DB transaction
+from sqlalchemy.ext.asyncio import AsyncSession # this function writes inside a DB transaction
+from sqlalchemy import insert, select, func
+from sqlalchemy.event import listens_for
+from sqlalchemy.orm import Session, selectinload, undefer
 from datetime import datetime, timezone
-from typing import Dict, Any, Optional # event payload is JSON-like + actor_id/reason may be optional
+from typing import Dict, Any, List, Optional, Sequence # event payload is JSON-like + actor_id/reason may be optional
 from app.db.models import Case, CaseEventLog, ActorType, CaseStatus, EventType # CaseEventLog is the table we insert into ; EventType, ActorType ensures we use standard enums (no random strings)
-import json
+import orjson
 import uuid
 # All case mutations go through this service
 # Forces append-only disclipline
 # Centralizes audit behavior
 
+# Bumped whenever a transaction that wrote events commits, so read-side caches (e.g. /debug/latest) can tell
+# they are stale. Not at flush: a cache rebuilt between flush and commit would store the pre-commit body
+# under the new version. Per-process only: other workers' writes are picked up when their cache TTL runs out.
+_events_version = 0
+_PENDING_EVENT_WRITES = "pending_event_writes" # Session.info key: events flushed in the open transaction
+
+def events_version() -> int:
+    return _events_version
+
+def _note_event_writes(db: AsyncSession, count: int) -> None:
+    db.info[_PENDING_EVENT_WRITES] = db.info.get(_PENDING_EVENT_WRITES, 0) + count
+
+@listens_for(Session, "after_commit") # AsyncSession commits through its sync Session, so this covers both
+def _publish_event_writes(session: Session) -> None:
+    global _events_version
+    if session.info.pop(_PENDING_EVENT_WRITES, 0):
+        _events_version += 1
+
+@listens_for(Session, "after_rollback") # rolled-back events were never visible; nothing to invalidate
+def _discard_event_writes(session: Session) -> None:
+    session.info.pop(_PENDING_EVENT_WRITES, None)
+
 def utc_now():
     return datetime.now(timezone.utc)
 
@@ -28,8 +53,7 @@ def build_case_created_payload(
 
         return payload
 
-def append_event(
-          db: Session, 
+def build_event_row(
           case_id: uuid.UUID, 
           event_type: EventType, 
           payload: Optional[dict[str, Any]] = None,
@@ -37,8 +61,9 @@ def append_event(
           actor_id: Optional[str] = None,
           reason: Optional[str] = None,
           occurred_at: Optional[datetime] = None,
-) -> CaseEventLog: 
-    # Write one immutable event row to CaseEventLog for a specific case
+) -> Dict[str, Any]: 
+    # Validate one event and return its CaseEventLog column values (shared by the ORM and Core insert paths).
+    # id is assigned here so batches can be added together and flushed once.
     
     if payload is None:
         payload = {}
@@ -50,32 +75,88 @@ def append_event(
     if any(not isinstance(k, str) for k in payload.keys()):
         raise ValueError("payload keys must be strings")
          
-    # 2) validate JSON-serializable
+    # 2) validate JSON-serializable (orjson: same encoder the engine uses for the JSON column)
     try:
-        json.dumps(payload)
-    except TypeError as e:
+        orjson.dumps(payload)
+    except TypeError as e: # orjson.JSONEncodeError subclasses TypeError
         raise ValueError(f"payload is not JSON-serializable: {e}")
     
     if occurred_at is None:
         occurred_at = utc_now()
 
-    event = CaseEventLog(
+    return {
+        "id": uuid.uuid4(),
+        "case_id": case_id,
+        "event_type": event_type,
+        "occurred_at": occurred_at,
+        "actor_type": actor_type,
+        "actor_id": actor_id,
+        "reason": reason,
+        "payload": payload,
+    }
+
+def build_event(
+          case_id: uuid.UUID, 
+          event_type: EventType, 
+          payload: Optional[dict[str, Any]] = None,
+          actor_type: ActorType = ActorType.SYSTEM,
+          actor_id: Optional[str] = None,
+          reason: Optional[str] = None,
+          occurred_at: Optional[datetime] = None,
+) -> CaseEventLog: 
+    # Build one validated, unattached CaseEventLog row (caller adds it to the session).
+    return CaseEventLog(**build_event_row(
         case_id=case_id,
         event_type=event_type,
-        occurred_at=occurred_at,
+        payload=payload,
         actor_type=actor_type,
         actor_id=actor_id,
         reason=reason,
+        occurred_at=occurred_at,
+    ))
+
+async def append_event(
+          db: AsyncSession, 
+          case_id: uuid.UUID, 
+          event_type: EventType, 
+          payload: Optional[dict[str, Any]] = None,
+          actor_type: ActorType = ActorType.SYSTEM,
+          actor_id: Optional[str] = None,
+          reason: Optional[str] = None,
+          occurred_at: Optional[datetime] = None,
+) -> CaseEventLog: 
+    # Write one immutable event row to CaseEventLog for a specific case
+    event = build_event(
+        case_id=case_id,
+        event_type=event_type,
         payload=payload,
-        
+        actor_type=actor_type,
+        actor_id=actor_id,
+        reason=reason,
+        occurred_at=occurred_at,
     )
 
     db.add(event)
-    db.flush() # assigns event.id without committing
+    await db.flush() # writes the row without committing
+
+    _note_event_writes(db, 1)
     return event
 
-def create_case_from_intake(
-        db: Session,
+async def append_events_bulk(db: AsyncSession, rows: Sequence[Dict[str, Any]]) -> List[uuid.UUID]:
+    # Batch path for system-generated bursts (imports, backfills): each row takes build_event_row's
+    # keyword arguments. One Core-style INSERT for the whole batch; no CaseEventLog instances,
+    # identity-map entries or unit-of-work pass. Returns the new event ids in input order.
+    if not rows:
+        return []
+
+    values = [build_event_row(**row) for row in rows]
+    await db.execute(insert(CaseEventLog), values)
+
+    _note_event_writes(db, len(values))
+    return [value["id"] for value in values]
+
+async def create_case_from_intake(
+        db: AsyncSession,
         intake_payload: Dict[str, Any],
         source: str,
         intake_channel: Optional[str] = None,
@@ -99,12 +180,9 @@ def create_case_from_intake(
         status=CaseStatus.OPEN,
         initial_awareness_at=None,
     )
-    db.add(case)
-    db.flush() # ensure case.id is available
 
     created_payload = build_case_created_payload(source=source, intake_channel=intake_channel, external_ref=external_ref,)
-    append_event(
-        db=db,
+    created_evt = build_event(
         case_id=case.id,
         event_type=EventType.CASE_CREATED, # adjust name if your enum differs
         payload=created_payload,
@@ -120,8 +198,7 @@ def create_case_from_intake(
     if external_ref:
         intake_event_payload["external_ref"] = external_ref
 
-    append_event(
-        db=db,
+    intake_evt = build_event(
         case_id=case.id,
         event_type=EventType.INTAKE_RECEIVED, # adjust name if your enum differs
         payload=intake_event_payload,
@@ -129,9 +206,50 @@ def create_case_from_intake(
         actor_id=actor_id,
     )
 
+    # One flush for the whole intake: the unit of work orders the case INSERT
+    # before the events (FK) and batches both event rows into a single statement.
+    db.add_all([case, created_evt, intake_evt])
+    await db.flush()
+
+    _note_event_writes(db, 2)
     return case
 
 
+async def list_recent_cases(db: AsyncSession, limit: int = 50) -> List[Case]:
+    # Newest cases with their event timelines: 2 queries total (cases, then every case's events in one IN query).
+    # selectinload rather than joinedload: events is 1:N, a join would repeat each case row once per event.
+    result = await db.execute(
+        select(Case)
+        .order_by(Case.received_at.desc())
+        .limit(limit)
+        .options(selectinload(Case.events))
+    )
+    return list(result.scalars().all())
+
+async def list_recent_cases_with_counts(db: AsyncSession, limit: int = 50) -> List[Case]:
+    # Newest cases for listings that only show "N events": one query, the count comes back as
+    # Case.event_count from a correlated subquery and no event rows leave the database.
+    result = await db.execute(
+        select(Case)
+        .order_by(Case.received_at.desc())
+        .limit(limit)
+        .options(undefer(Case.event_count))
+    )
+    return list(result.scalars().all())
+
+async def count_events_by_case(db: AsyncSession, case_ids: Sequence[uuid.UUID]) -> Dict[uuid.UUID, int]:
+    # Event counts for many cases in one grouped query, without loading the events themselves
+    if not case_ids:
+        return {}
+    rows = await db.execute(
+        select(CaseEventLog.case_id, func.count())
+        .where(CaseEventLog.case_id.in_(case_ids))
+        .group_by(CaseEventLog.case_id)
+    )
+    counts = dict(rows.all())
+    return {case_id: counts.get(case_id, 0) for case_id in case_ids}
+
+
 def redact_intake_payload():
     # Whitelists fields /
     pass
\ No newline at end of file
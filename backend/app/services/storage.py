@@ -2,15 +2,19 @@ from __future__ import annotations                                  # lets Pytho
 
 
 from pydantic import BaseModel                                      # Defines request/ response models with automatic validation and parsing
-from typing import Dict, Optional, List, TypedDict, Literal, Any    # type checking & documentation; defines the shape of dicts (e.g., what keys a stored run must have)
+from typing import Dict, Optional, List, Tuple, TypedDict, Literal, Any   # type checking & documentation; defines the shape of dicts (e.g., what keys a stored run must have)
+from typing_extensions import NotRequired                            # optional TypedDict keys (typing only has it from 3.11)
 import threading                                                    # run tasks concurrently; thread-safe
 import copy                                                         # clone Python objects safely; ensures callers get copies of stored runs, so they can't accidentally mutate the store's internal state
-from datetime import datetime,  timezone                            # handle timestamps and time-zones
+import os                                                           # REDIS_URL / RUN_TTL_SECONDS select and configure the run store
+import orjson                                                       # (de)serializes runs for the Redis-backed store
+from app.core.clock import utc_now_iso                              # millisecond UTC stamps for created_at/updated_at
 
 RunStatus = Literal["active", "completed", "cancelled"] # Literal - restricts a string to a specific value(s)
 
 class HistoryStep(TypedDict):  # A single answered step in a run's history
     question_id: str
+    section: NotRequired[str]   # question ids repeat across sections; absent on runs stored before it was recorded
     answer: str
 
 class SurveyRun(TypedDict, total=False):
@@ -24,67 +28,253 @@ class SurveyRun(TypedDict, total=False):
     created_at: str
     updated_at: str
 
+class RunConflict(Exception): # the run moved on (another write landed) between the caller's read and its write
+    pass
+
 # ---- Helper function ----
-def _ts_utc_iso() -> str:
-    now_utc = datetime.now(timezone.utc)
-    return now_utc.isoformat(timespec="milliseconds").replace("+00:00", "Z")
+def _clone_run(run: SurveyRun) -> SurveyRun:
+    # Structural copy for the known SurveyRun shape: the top level, each history step, each answer record and
+    # the summary are flat dicts of JSON scalars, so copying those containers is as safe as copy.deepcopy
+    # at a fraction of the cost (no memo dict, no __reduce_ex__ walk).
+    clone = dict(run)
+    history = run.get("history")
+    if history is not None:
+        clone["history"] = [dict(step) for step in history]
+    answers = run.get("answers_by_id")
+    if answers is not None:
+        clone["answers_by_id"] = {qid: dict(record) for qid, record in answers.items()}
+    summary = run.get("summary")
+    if summary is not None:
+        clone["summary"] = dict(summary)
+    return clone
 
 # ---- Store Implementation ----
 
+_LOCK_STRIPES = 64 # writers to different runs almost never share a lock
+
 class InMemoryRunStore:
+    # Concurrency model:
+    # - Stored runs are never mutated after they are published into _runs; every write builds a new dict
+    #   and swaps it in with a single (atomic) dict assignment. Reads therefore need no lock at all.
+    # - Writes to the same run are serialized by that run's stripe lock (check-then-set must be atomic).
+    # - A get_run racing a write to the same run returns either the old or the new snapshot, never a mix.
+    #   A thread always sees its own completed writes.
     def __init__(self) -> None:
         
         self._runs: Dict[str, SurveyRun] = {}   # _runs holds run_id -> SurveyRun
-        self._lock = threading.RLock() # RLock allows re-entrant acquisition (safe if a method calls another) so concurrent requests dont corrupt shared data.
+        self._locks = tuple(threading.Lock() for _ in range(_LOCK_STRIPES)) # striped: one lock per hash bucket of run_id instead of one lock for the whole store
+
+    def _lock_for(self, run_id: str) -> threading.Lock:
+        return self._locks[hash(run_id) % _LOCK_STRIPES]
 
     def create_run(self, run: SurveyRun) -> None:   # insert a brand new run, fails if run_id already exists. Caller must provide a valid SurveyRun with run_id set.
         if "run_id" not in run or not run["run_id"]:
             raise ValueError(f"create_run: run.run_id is required.")
             
-        with self._lock:    # [with] is a context manager used to acquire the start of the block (One Thread at a time) running the code inside the block safely and releasing the lock automatically at the end (Error or not)
+        with self._lock_for(run["run_id"]):    # [with] is a context manager used to acquire the start of the block (One Thread at a time) running the code inside the block safely and releasing the lock automatically at the end (Error or not)
             if run["run_id"] in self._runs:
                 raise ValueError(f"create_run: run_id '{run['run_id']}' already exists.")
             
             # Stamp timestamps if caller forgot (defensive)
-            run = copy.deepcopy(run)
-            run.setdefault("created_at", _ts_utc_iso())
+            run = _clone_run(run)
+            run.setdefault("created_at", utc_now_iso())
             run.setdefault("updated_at", run['created_at'])
 
             self._runs[run["run_id"]] = run
 
     def get_run(self, run_id: str) -> Optional[SurveyRun]:
-        with self._lock:
-            run = self._runs.get(run_id)
-            return copy.deepcopy(run) if run else None
+        run = self._runs.get(run_id) # lock-free: published runs are immutable, dict.get is atomic
+        return _clone_run(run) if run else None
 
     def update_run(self, run_id: str, **changes: Any) -> SurveyRun:
-        with self._lock:
+        with self._lock_for(run_id):
             if run_id not in self._runs:
                 raise KeyError(f"update_run: run_id '{run_id}' not found")
             
-            # update in place
-            record = self._runs[run_id]
+            # copy-on-write: lock-free readers may be copying the current record right now
+            record = dict(self._runs[run_id])
             for k, v in changes.items():
-                record[k] = v
+                record[k] = copy.deepcopy(v)
 
             # Always bump updated_at
-            record["updated_at"] = _ts_utc_iso()
-            return copy.deepcopy(record)
+            record["updated_at"] = utc_now_iso()
+            self._runs[run_id] = record
+            return _clone_run(record)
 
     def replace_run(self, run: SurveyRun) -> SurveyRun:
 
         if "run_id" not in run or not run["run_id"]:
             raise ValueError("replace_run: run.run_id is required")
             
-        with self._lock:   # thread safety; one run at a time
+        with self._lock_for(run["run_id"]):   # thread safety; one writer per run at a time
             run_id = run["run_id"]
             if run_id not in self._runs:
                 raise KeyError(f"replace_run: run_id '{run_id}' not found")
             
-            new_run = copy.deepcopy(run)
-            new_run["updated_at"] = _ts_utc_iso()
+            new_run = _clone_run(run)
+            new_run["updated_at"] = utc_now_iso()
             self._runs[run_id] = new_run
-            return copy.deepcopy(new_run)
+            return _clone_run(new_run)
 
             #replace run
 
+    def append_answer(self, run_id: str, question_id: str, record: Dict[str, Any], step: HistoryStep,
+                      *, expected_section: Optional[str], **changes: Any) -> None:
+        # Persist one answered step: set answers_by_id[question_id], append the history step, apply the
+        # top-level changes (cursor/status/...). Only the delta is copied, not the whole run.
+        # The caller validated the answer against an unlocked snapshot, so the step is only written if the run
+        # is still active at (expected_section, question_id); otherwise RunConflict (a concurrent answer won).
+        with self._lock_for(run_id):
+            current = self._runs.get(run_id)
+            if current is None:
+                raise KeyError(f"append_answer: run_id '{run_id}' not found")
+            if (current.get("status") != "active" or current.get("cursor") != question_id
+                    or current.get("active_section") != expected_section):
+                raise RunConflict(f"append_answer: run '{run_id}' is no longer at '{question_id}'")
+
+            # copy-on-write; unchanged steps/records are shared with the previous version (never mutated)
+            new_run = dict(current)
+            new_run["answers_by_id"] = {**current.get("answers_by_id", {}), question_id: dict(record)}
+            new_run["history"] = [*current.get("history", []), dict(step)]
+            for k, v in changes.items():
+                new_run[k] = copy.deepcopy(v)
+            new_run["updated_at"] = utc_now_iso()
+            self._runs[run_id] = new_run
+
+
+_RUN_LIST_FIELDS = ("history", "answers_by_id") # kept in their own keys so one answer is written as a delta
+
+class RedisRunStore:
+    # Same interface as InMemoryRunStore, shared by every worker/process that points at the same Redis.
+    # Layout per run (all three keys expire RUN_TTL_SECONDS after the run's last write):
+    #   run:{id}          hash  top-level field -> orjson value (everything except history/answers_by_id)
+    #   run:{id}:answers  hash  question_id -> orjson answer record
+    #   run:{id}:history  list  orjson history steps, in answer order
+    def __init__(self, url: str, ttl_seconds: int = 86400) -> None:
+        import redis # only needed when REDIS_URL is configured
+
+        self._redis = redis.Redis.from_url(url)
+        self._ttl = ttl_seconds
+
+    @staticmethod
+    def _keys(run_id: str) -> Tuple[str, str, str]:
+        base = f"run:{run_id}"
+        return base, f"{base}:answers", f"{base}:history"
+
+    def _write_full(self, pipe, run: SurveyRun) -> None: # queue a full (re)write of run into pipe
+        meta_key, answers_key, history_key = self._keys(run["run_id"])
+        pipe.delete(meta_key, answers_key, history_key)
+        pipe.hset(meta_key, mapping={k: orjson.dumps(v) for k, v in run.items() if k not in _RUN_LIST_FIELDS})
+        answers = run.get("answers_by_id") or {}
+        if answers:
+            pipe.hset(answers_key, mapping={qid: orjson.dumps(rec) for qid, rec in answers.items()})
+        history = run.get("history") or []
+        if history:
+            pipe.rpush(history_key, *[orjson.dumps(step) for step in history])
+        self._expire(pipe, run["run_id"])
+
+    def _expire(self, pipe, run_id: str) -> None:
+        for key in self._keys(run_id):
+            pipe.expire(key, self._ttl)
+
+    def create_run(self, run: SurveyRun) -> None:
+        if "run_id" not in run or not run["run_id"]:
+            raise ValueError(f"create_run: run.run_id is required.")
+
+        run = _clone_run(run)
+        run.setdefault("created_at", utc_now_iso())
+        run.setdefault("updated_at", run['created_at'])
+
+        meta_key = self._keys(run["run_id"])[0]
+
+        # WATCH the run key: the existence check and the full write (all three keys + TTLs) commit in one
+        # MULTI/EXEC, so a run is either absent or complete -- never a bare claim without data or expiry.
+        # A concurrent create of the same id aborts the EXEC; the retry then sees the key and raises.
+        def _apply(pipe) -> None:
+            if pipe.exists(meta_key):
+                raise ValueError(f"create_run: run_id '{run['run_id']}' already exists.")
+            pipe.multi()
+            self._write_full(pipe, run)
+
+        self._redis.transaction(_apply, meta_key)
+
+    def get_run(self, run_id: str) -> Optional[SurveyRun]:
+        meta_key, answers_key, history_key = self._keys(run_id)
+        with self._redis.pipeline() as pipe: # MULTI/EXEC: the three reads see one consistent version
+            pipe.hgetall(meta_key)
+            pipe.hgetall(answers_key)
+            pipe.lrange(history_key, 0, -1)
+            meta, answers, history = pipe.execute()
+        if not meta:
+            return None
+        run: SurveyRun = {k.decode(): orjson.loads(v) for k, v in meta.items()}
+        run["answers_by_id"] = {qid.decode(): orjson.loads(rec) for qid, rec in answers.items()}
+        run["history"] = [orjson.loads(step) for step in history]
+        return run
+
+    def update_run(self, run_id: str, **changes: Any) -> SurveyRun:
+        meta_key = self._keys(run_id)[0]
+
+        # WATCH the run so the existence check and the write are one optimistic transaction
+        def _apply(pipe) -> None:
+            if not pipe.exists(meta_key):
+                raise KeyError(f"update_run: run_id '{run_id}' not found")
+            current = self.get_run(run_id)
+            current.update(changes)
+            current["updated_at"] = utc_now_iso() # Always bump updated_at
+            pipe.multi()
+            self._write_full(pipe, current)
+
+        self._redis.transaction(_apply, meta_key)
+        return self.get_run(run_id)
+
+    def replace_run(self, run: SurveyRun) -> SurveyRun:
+        if "run_id" not in run or not run["run_id"]:
+            raise ValueError("replace_run: run.run_id is required")
+
+        new_run = _clone_run(run)
+        new_run["updated_at"] = utc_now_iso()
+        meta_key = self._keys(new_run["run_id"])[0]
+
+        def _apply(pipe) -> None:
+            if not pipe.exists(meta_key):
+                raise KeyError(f"replace_run: run_id '{new_run['run_id']}' not found")
+            pipe.multi()
+            self._write_full(pipe, new_run)
+
+        self._redis.transaction(_apply, meta_key)
+        return new_run
+
+    def append_answer(self, run_id: str, question_id: str, record: Dict[str, Any], step: HistoryStep,
+                      *, expected_section: Optional[str], **changes: Any) -> None:
+        # One answered step as a delta: HSET the answer, RPUSH the history step, HSET the changed top-level
+        # fields + updated_at, refresh the TTLs -- all in one MULTI/EXEC, O(one step) regardless of run length.
+        # The run position is re-read under WATCH: if it is no longer (active, expected_section, question_id)
+        # a concurrent answer won and this one raises RunConflict; if it changes before EXEC, the transaction retries.
+        meta_key, answers_key, history_key = self._keys(run_id)
+
+        def _apply(pipe) -> None:
+            found, status, cursor, section = pipe.hmget(meta_key, "run_id", "status", "cursor", "active_section")
+            if found is None:
+                raise KeyError(f"append_answer: run_id '{run_id}' not found")
+            if (status is None or orjson.loads(status) != "active"
+                    or cursor is None or orjson.loads(cursor) != question_id
+                    or section is None or orjson.loads(section) != expected_section):
+                raise RunConflict(f"append_answer: run '{run_id}' is no longer at '{question_id}'")
+            pipe.multi()
+            pipe.hset(answers_key, question_id, orjson.dumps(record))
+            pipe.rpush(history_key, orjson.dumps(step))
+            fields = {k: orjson.dumps(v) for k, v in changes.items()}
+            fields["updated_at"] = orjson.dumps(utc_now_iso())
+            pipe.hset(meta_key, mapping=fields)
+            self._expire(pipe, run_id)
+
+        self._redis.transaction(_apply, meta_key)
+
+
+def make_run_store():
+    # REDIS_URL set -> runs are shared across workers; otherwise a per-process in-memory store (dev / single worker)
+    url = os.getenv("REDIS_URL")
+    if url:
+        return RedisRunStore(url, ttl_seconds=int(os.getenv("RUN_TTL_SECONDS", "86400")))
+    return InMemoryRunStore()
@@ -0,0 +1,126 @@
+# /debug/latest: ETag / If-None-Match handling and the short-lived serialized-body cache.
+# get_read_db is overridden with a fake session, so no database is needed.
+import os
+import uuid
+from datetime import datetime, timezone
+
+os.environ.setdefault("DATABASE_URL", "postgresql+asyncpg://test@localhost/test") # session.py requires it at import; never connected
+
+import orjson
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from app.api import debug
+from app.db.session import get_read_db
+from app.services import case_events
+
+CASE_ID = uuid.UUID("00000000-0000-0000-0000-000000000001")
+LAST_EVENT_AT = datetime(2026, 1, 2, 3, 4, 5, 600000, tzinfo=timezone.utc)
+DOCUMENT = orjson.dumps({"case": {"id": str(CASE_ID)}, "events": [{"event_type": "case.created"}]}).decode()
+ETAG = f'W/"{CASE_ID}-2-{LAST_EVENT_AT.isoformat()}"'
+
+
+class _Result:
+    def __init__(self, row):
+        self._row = row
+
+    def first(self):
+        return self._row
+
+class FakeSession: # answers the two statements /debug/latest issues and records which ones ran
+    def __init__(self, has_case: bool = True):
+        self.has_case = has_case
+        self.executed = []
+
+    async def execute(self, statement):
+        if statement is debug._LATEST_ETAG:
+            self.executed.append("etag")
+            return _Result((CASE_ID, 2, LAST_EVENT_AT) if self.has_case else None)
+        if statement is debug._LATEST_BODY:
+            self.executed.append("body")
+            return _Result((DOCUMENT, CASE_ID, 2, LAST_EVENT_AT) if self.has_case else None)
+        raise AssertionError(f"unexpected statement: {statement}")
+
+
+app = FastAPI()
+app.include_router(debug.router)
+client = TestClient(app)
+
+@pytest.fixture
+def session(monkeypatch):
+    fake = FakeSession()
+
+    async def _get_fake_db():
+        yield fake
+
+    monkeypatch.setattr(debug, "_latest_cache", None)
+    app.dependency_overrides[get_read_db] = _get_fake_db
+    yield fake
+    app.dependency_overrides.clear()
+
+def _bump_events_version(monkeypatch):
+    monkeypatch.setattr(case_events, "_events_version", case_events.events_version() + 1)
+
+
+def test_cold_request_builds_the_body(session):
+    resp = client.get("/debug/latest")
+    assert resp.status_code == 200
+    assert resp.headers["ETag"] == ETAG
+    assert resp.content == DOCUMENT.encode()
+    assert session.executed == ["body"]
+
+def test_cached_body_is_served_without_queries(session):
+    client.get("/debug/latest")
+    resp = client.get("/debug/latest")
+    assert resp.status_code == 200
+    assert resp.content == DOCUMENT.encode()
+    assert session.executed == ["body"]
+
+def test_cached_etag_match_returns_304(session):
+    client.get("/debug/latest")
+    resp = client.get("/debug/latest", headers={"If-None-Match": ETAG})
+    assert resp.status_code == 304
+    assert resp.headers["ETag"] == ETAG
+    assert resp.content == b""
+    assert session.executed == ["body"]
+
+def test_stale_cache_with_matching_etag_only_probes(session, monkeypatch):
+    client.get("/debug/latest")
+    _bump_events_version(monkeypatch)
+
+    resp = client.get("/debug/latest", headers={"If-None-Match": ETAG})
+    assert resp.status_code == 304
+    assert session.executed == ["body", "etag"] # the body query is skipped
+
+def test_expired_cache_with_matching_etag_only_probes(session, monkeypatch):
+    monkeypatch.setattr(debug, "_CACHE_TTL_SECONDS", 0.0)
+    client.get("/debug/latest")
+
+    resp = client.get("/debug/latest", headers={"If-None-Match": ETAG})
+    assert resp.status_code == 304
+    assert session.executed == ["body", "etag"]
+
+def test_stale_etag_mismatch_refetches_the_body(session, monkeypatch):
+    client.get("/debug/latest")
+    _bump_events_version(monkeypatch)
+
+    resp = client.get("/debug/latest", headers={"If-None-Match": 'W/"old"'})
+    assert resp.status_code == 200
+    assert resp.headers["ETag"] == ETAG
+    assert resp.content == DOCUMENT.encode()
+    assert session.executed == ["body", "etag", "body"]
+
+def test_events_version_change_invalidates_the_cache(session, monkeypatch):
+    client.get("/debug/latest")
+    _bump_events_version(monkeypatch)
+
+    assert client.get("/debug/latest").status_code == 200
+    assert session.executed == ["body", "body"]
+
+def test_no_cases(session):
+    session.has_case = False
+    resp = client.get("/debug/latest")
+    assert resp.status_code == 200
+    assert resp.headers["ETag"] == 'W/"none"'
+    assert resp.json() == {"case": None, "events": []}
@@ -0,0 +1,81 @@
+# Stateful run endpoints (/survey/begin, /survey/answer, /survey/runs/{run_id}/answers).
+# Only the runs router is mounted, each test gets a fresh in-memory store.
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from app.routes import runs
+from app.services.storage import InMemoryRunStore, _clone_run
+
+app = FastAPI()
+app.include_router(runs.router, prefix="/api")
+client = TestClient(app)
+
+
+@pytest.fixture(autouse=True)
+def store(monkeypatch):
+    fresh = InMemoryRunStore()
+    monkeypatch.setattr(runs, "STORE", fresh)
+    return fresh
+
+def _begin() -> str:
+    resp = client.post("/api/survey/begin")
+    assert resp.status_code == 200
+    return resp.json()["run_id"]
+
+def _answer(run_id: str, question_id: str, answer: str):
+    return client.post("/api/survey/answer", json={"run_id": run_id, "question_id": question_id, "answer": answer})
+
+
+def test_concurrent_answers_to_the_same_step(store):
+    # Both requests read the run before either writes: replay the same pre-answer snapshot for each
+    run_id = _begin()
+    snapshot = store.get_run(run_id)
+    store.get_run = lambda rid: _clone_run(snapshot)
+
+    first = _answer(run_id, "q1", "b")
+    second = _answer(run_id, "q1", "a")
+    del store.get_run
+
+    assert first.status_code == 200
+    assert second.status_code == 409
+    assert second.json()["detail"]["error"]["code"] == "FLOW_DIVERGENCE"
+    history = store.get_run(run_id)["history"]
+    assert [(s["question_id"], s["answer"]) for s in history] == [("q1", "b")]
+
+def test_answer_log_resolves_each_step_in_its_own_section():
+    # q1 is answered three times, once per section; each log entry must use its own section's node
+    run_id = _begin()
+    steps = [
+        ("q1", "a"), ("q2", "b"), ("q3", "a"), ("q4", "d"), ("q4_missing", "a"), ("q5", "drug"), ("q6", "bad"),
+        ("q1", "a"),  # ae_selector: Abdominal / GI
+        ("q1", "b"),  # abdominal_questions: approximate date
+    ]
+    for qid, answer in steps:
+        assert _answer(run_id, qid, answer).status_code == 200
+
+    resp = client.get(f"/api/survey/runs/{run_id}/answers")
+    assert resp.status_code == 200
+    body = resp.json()
+    assert body["run_id"] == run_id
+    assert body["status"] == "active"
+
+    log = body["answers"]
+    assert [(e["question_id"], e["section"]) for e in log[-3:]] == [
+        ("q6", "min_criteria_questions"), ("q1", "ae_selector"), ("q1", "abdominal_questions"),
+    ]
+    q1_entries = [e for e in log if e["question_id"] == "q1"]
+    assert [e["question_text"] for e in q1_entries] == [
+        "Who is reporting this information?",
+        "Which symptom category best matches?",
+        "When did this symptom start?",
+    ]
+    assert [e["answer"]["label"] for e in q1_entries] == [
+        "I am a healthcare professional (HCP)", "Abdominal / GI", "Approximate date",
+    ]
+    assert log[-3]["answer"] == {"type": "free_text", "value": "bad"}
+
+def test_answer_log_unknown_run():
+    resp = client.get("/api/survey/runs/does-not-exist/answers")
+    assert resp.status_code == 404
+    assert resp.json()["detail"]["error"]["code"] == "UNKNOWN_RUN"
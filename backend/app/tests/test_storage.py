@@ -0,0 +1,137 @@
+# Run stores: InMemoryRunStore and RedisRunStore (against fakeredis) share one interface and one contract.
+import pytest
+
+from app.services.storage import InMemoryRunStore, RedisRunStore, RunConflict
+
+
+@pytest.fixture
+def redis_store(monkeypatch):
+    fakeredis = pytest.importorskip("fakeredis")
+    monkeypatch.setattr("redis.Redis.from_url", lambda url: fakeredis.FakeRedis())
+    return RedisRunStore("redis://test", ttl_seconds=60)
+
+@pytest.fixture(params=["memory", "redis"])
+def store(request):
+    if request.param == "memory":
+        return InMemoryRunStore()
+    return request.getfixturevalue("redis_store")
+
+def _new_run(run_id: str = "r1") -> dict: # the record /survey/begin creates
+    return {
+        "run_id": run_id,
+        "version": "v1",
+        "status": "active",
+        "active_section": "min_criteria_questions",
+        "cursor": "q1",
+        "history": [],
+        "answers_by_id": {},
+        "summary": None,
+    }
+
+def _answer(store, question_id="q1", key="a", section="min_criteria_questions", **changes):
+    record = {"type": "single_choice", "key": key, "label": key.upper()}
+    step = {"question_id": question_id, "section": section, "answer": key}
+    store.append_answer("r1", question_id, record, step, expected_section=section, **changes)
+
+
+# ---- create_run / get_run ----
+
+def test_create_run_rejects_a_duplicate_id(store):
+    store.create_run(_new_run())
+    with pytest.raises(ValueError):
+        store.create_run(_new_run())
+    assert store.get_run("r1")["cursor"] == "q1"
+
+def test_get_run_unknown_id(store):
+    assert store.get_run("missing") is None
+
+def test_redis_ttl_covers_all_three_keys(redis_store):
+    redis_store.create_run(_new_run())
+    _answer(redis_store, cursor="q2")
+
+    client = redis_store._redis
+    for key in ("run:r1", "run:r1:answers", "run:r1:history"):
+        assert 0 < client.ttl(key) <= 60, key
+
+def test_redis_round_trip_matches_memory(redis_store):
+    # same writes on both stores -> the same SurveyRun back (timestamps aside)
+    memory_store = InMemoryRunStore()
+    for s in (memory_store, redis_store):
+        s.create_run(_new_run())
+        _answer(s, active_section="ae_selector", cursor="q1")
+        _answer(s, key="b", section="ae_selector", cursor="q2")
+        s.update_run("r1", summary={"still_pain": True})
+
+    def strip(run):
+        return {k: v for k, v in run.items() if k not in ("created_at", "updated_at")}
+
+    assert strip(redis_store.get_run("r1")) == strip(memory_store.get_run("r1"))
+
+def test_redis_replace_run_rewrites_all_keys(redis_store):
+    redis_store.create_run(_new_run())
+    _answer(redis_store, cursor="q2")
+
+    run = redis_store.get_run("r1")
+    run["history"] = []
+    run["answers_by_id"] = {}
+    run["cursor"] = "q1"
+    redis_store.replace_run(run)
+
+    stored = redis_store.get_run("r1")
+    assert (stored["history"], stored["answers_by_id"], stored["cursor"]) == ([], {}, "q1")
+
+def test_update_and_replace_unknown_run(store):
+    with pytest.raises(KeyError):
+        store.update_run("missing", cursor="q2")
+    with pytest.raises(KeyError):
+        store.replace_run(_new_run("missing"))
+
+
+# ---- append_answer ----
+
+def test_append_answer_writes_the_step(store):
+    store.create_run(_new_run())
+    _answer(store, cursor="q2")
+
+    run = store.get_run("r1")
+    assert run["cursor"] == "q2"
+    assert run["answers_by_id"] == {"q1": {"type": "single_choice", "key": "a", "label": "A"}}
+    assert run["history"] == [{"question_id": "q1", "section": "min_criteria_questions", "answer": "a"}]
+    assert run["updated_at"] >= run["created_at"]
+
+def test_append_answer_moves_section(store):
+    store.create_run(_new_run())
+    _answer(store, active_section="ae_selector", cursor="q1")
+    _answer(store, key="b", section="ae_selector", status="completed", cursor=None)
+
+    run = store.get_run("r1")
+    assert (run["status"], run["cursor"], run["active_section"]) == ("completed", None, "ae_selector")
+    assert [(s["section"], s["answer"]) for s in run["history"]] == [("min_criteria_questions", "a"), ("ae_selector", "b")]
+
+def test_second_answer_to_the_same_step_conflicts(store):
+    # both requests validated against the same snapshot (cursor q1); only the first may be written
+    store.create_run(_new_run())
+    _answer(store, key="b", cursor="q2")
+    with pytest.raises(RunConflict):
+        _answer(store, key="a", cursor="q2")
+
+    run = store.get_run("r1")
+    assert [(s["question_id"], s["answer"]) for s in run["history"]] == [("q1", "b")]
+    assert run["answers_by_id"]["q1"]["key"] == "b"
+
+def test_append_answer_rejects_a_stale_section(store):
+    store.create_run(_new_run())
+    with pytest.raises(RunConflict):
+        _answer(store, section="abdominal_questions", cursor="q2")
+    assert store.get_run("r1")["history"] == []
+
+def test_append_answer_rejects_an_inactive_run(store):
+    run = _new_run()
+    run["status"] = "cancelled"
+    store.create_run(run)
+    with pytest.raises(RunConflict):
+        _answer(store, cursor="q2")
+
+def test_append_answer_unknown_run(store):
+    with pytest.raises(KeyError):
+        _answer(store, cursor="q2")
@@ -0,0 +1,161 @@
+# Survey engine endpoints (/survey/next, /survey/evaluate) through the HTTP layer.
+# Only the survey router is mounted, so these run without a database or the run store.
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from app.api import survey
+
+app = FastAPI()
+app.include_router(survey.router, prefix="/api")
+client = TestClient(app)
+
+# q1 b -> q1b, q2 a -> q4 ... q20 b -> END, with the worst pain score
+FULL_HISTORY = [
+    ("q1", "b"), ("q1b", "2 weeks"), ("q2", "a"), ("q4", "a"), ("q5", "e"), ("q6", "a"),
+    ("q7", "b"), ("q9", "b"), ("q11", "a"), ("q12", "a"), ("q13", "a"), ("q14", "a"),
+    ("q15", "a"), ("q16", "b"), ("q17", "b"), ("q18", "a"), ("q19", "b"), ("q20", "b"),
+]
+
+def _history(steps):
+    return {"history": [{"question_id": q, "answer": a} for q, a in steps]}
+
+def _error(resp, status, code):
+    assert resp.status_code == status
+    body = resp.json()["detail"]
+    assert body["error"]["code"] == code
+    assert "timestamp" in body["meta"]
+    return body["error"]
+
+
+# ---- /survey/next ----
+
+@pytest.mark.parametrize("kwargs", [{}, {"json": {}}])
+def test_next_start(kwargs):
+    resp = client.post("/api/survey/next", **kwargs)
+    assert resp.status_code == 200
+    body = resp.json()
+    assert body["done"] is False
+    assert body["section"] == "min_criteria_questions"
+    assert body["next"]["id"] == "q1"
+    assert body["meta"]["version"] == "v1"
+
+def test_next_advances_on_option():
+    resp = client.post("/api/survey/next", json={"question_id": "q2", "answer": "a"})
+    assert resp.status_code == 200
+    assert resp.json()["next"]["id"] == "q2a"
+
+def test_next_rejects_non_iso_date():
+    body = {"section": "abdominal_questions", "question_id": "q1a", "answer": "2025/01/01"}
+    _error(client.post("/api/survey/next", json=body), 400, "DATE_FORMAT")
+
+def test_next_accepts_iso_date():
+    body = {"section": "abdominal_questions", "question_id": "q1a", "answer": "2025-01-01"}
+    resp = client.post("/api/survey/next", json=body)
+    assert resp.status_code == 200
+    assert resp.json()["next"]["id"] == "q2"
+
+def test_next_rejects_invalid_key():
+    err = _error(client.post("/api/survey/next", json={"question_id": "q1", "answer": "z"}), 400, "INVALID_ANSWER")
+    assert "q1" in err["message"]
+
+def test_next_rejects_missing_answer():
+    _error(client.post("/api/survey/next", json={"question_id": "q1"}), 400, "MISSING_ANSWER")
+
+def test_next_rejects_unknown_question():
+    _error(client.post("/api/survey/next", json={"question_id": "zz", "answer": "a"}), 400, "UNKNOWN_QUESTION")
+
+def test_next_rejects_unknown_section():
+    _error(client.post("/api/survey/next", json={"section": "nope"}), 400, "UNKNOWN_SECTION")
+
+def test_next_rejects_empty_section():
+    # headache_questions is declared in the definition but has no questions yet
+    err = _error(client.post("/api/survey/next", json={"section": "headache_questions"}), 400, "EMPTY_SECTION")
+    assert "headache_questions" in err["message"]
+
+def test_next_follows_goto_into_another_section():
+    resp = client.post("/api/survey/next", json={"question_id": "q6", "answer": "went bad"})
+    assert resp.status_code == 200
+    body = resp.json()
+    assert (body["section"], body["next"]["id"]) == ("ae_selector", "q1")
+
+    # echoing the section back resolves q1 in the selector, not in min_criteria_questions
+    resp = client.post("/api/survey/next", json={"section": body["section"], "question_id": "q1", "answer": "a"})
+    assert resp.status_code == 200
+    body = resp.json()
+    assert (body["section"], body["next"]["id"]) == ("abdominal_questions", "q1")
+
+@pytest.mark.parametrize("section, qid, answer, key", [
+    ("min_criteria_questions", "q6", "went bad", None),  # free_text GOTO ae_selector:q1
+    ("ae_selector", "q1", "a", "a"),                     # option GOTO abdominal_questions:q1
+])
+def test_next_broken_goto_names_the_target_section(monkeypatch, section, qid, answer, key):
+    # a GOTO whose target question is missing has no precomputed payload; the error must say which section it looked in
+    target_section = survey._NEXT_INDEX[(section, qid, key)][0]
+    monkeypatch.delitem(survey._NEXT_PAYLOAD, (section, qid, key))
+    resp = client.post("/api/survey/next", json={"section": section, "question_id": qid, "answer": answer})
+    err = _error(resp, 500, "BROKEN_DEFINITION")
+    assert f"'q1' in section '{target_section}'" in err["message"]
+
+def test_next_end_finishes_the_survey():
+    resp = client.post("/api/survey/next", json={"section": "abdominal_questions", "question_id": "q20", "answer": "b"})
+    assert resp.status_code == 200
+    body = resp.json()
+    assert body["done"] is True
+    assert body["next"] is None
+    assert body["section"] is None
+
+@pytest.mark.parametrize("content", [b"not json", b"[]", b'"q1"', b'{"question_id": 5}', b'{"answer": ["a"]}', b'{"section": 1}'])
+def test_next_malformed_body(content):
+    resp = client.post("/api/survey/next", content=content, headers={"Content-Type": "application/json"})
+    _error(resp, 422, "INVALID_BODY")
+
+
+# ---- /survey/evaluate ----
+
+def test_evaluate_empty_history_starts_the_section():
+    resp = client.post("/api/survey/evaluate", json={"history": []})
+    assert resp.status_code == 200
+    body = resp.json()
+    assert body["done"] is False
+    assert body["next"]["id"] == "q1"
+    assert body["next"]["text"] == "When did this symptom start?"
+
+def test_evaluate_partial_history_returns_next_question():
+    resp = client.post("/api/survey/evaluate", json=_history([("q1", "a"), ("q1a", "2025-01-01"), ("q2", "a")]))
+    assert resp.status_code == 200
+    assert resp.json()["next"]["id"] == "q4"
+
+def test_evaluate_summary():
+    resp = client.post("/api/survey/evaluate", json=_history(FULL_HISTORY))
+    assert resp.status_code == 200
+    body = resp.json()
+    assert body["done"] is True
+    assert body["next"] is None
+    assert body["summary"] == {
+        "started_at_precision": "approx",
+        "started_at_value": "2 weeks",
+        "still_pain": True,
+        "pain_quality": "Sharp?",
+        "pain_scale": 10,
+        "requires_attention": True,
+    }
+
+def test_evaluate_rejects_non_iso_date():
+    _error(client.post("/api/survey/evaluate", json=_history([("q1", "a"), ("q1a", "01/01/2025")])), 400, "DATE_FORMAT")
+
+def test_evaluate_rejects_invalid_key():
+    err = _error(client.post("/api/survey/evaluate", json=_history([("q1", "z")])), 400, "INVALID_ANSWER")
+    assert "'z'" in err["message"]
+
+def test_evaluate_rejects_flow_divergence():
+    err = _error(client.post("/api/survey/evaluate", json=_history([("q2", "a")])), 400, "FLOW_DIVERGENCE")
+    assert err["message"] == "Expected 'q1', got 'q2'"
+
+@pytest.mark.parametrize("content", [
+    b"not json", b"[]", b"{}", b'{"history": {}}', b'{"history": [1]}',
+    b'{"history": [{"question_id": "q1"}]}', b'{"history": [{"question_id": "q1", "answer": 2}]}',
+])
+def test_evaluate_malformed_body(content):
+    resp = client.post("/api/survey/evaluate", content=content, headers={"Content-Type": "application/json"})
+    _error(resp, 422, "INVALID_BODY")